@@ -1,11 +1,16 @@
 import streamlit as st
 import time
-from auth import login, signup
-from proof_generator import generate_proof
+from auth import login, signup, get_user_info
+from proof_generator import gather_sources, generate_proof
+from utils.llm_client import GenerationError
 from evaluation import evaluate_proof
 from db import projects_collection
-from utils.github_scraper import search_github
-from utils.arxiv_scraper import search_arxiv
+from utils.prefetch import PrefetchManager
+from utils.quota import BATCH, INTERACTIVE
+from utils.proof_export import export_to_tempfile
+from utils.profiler import profile_request
+from contextlib import nullcontext
+from datetime import datetime, timezone
 import os
 
 # Page configuration
@@ -23,6 +28,22 @@ with open("style.css") as f:
 # Configure your GitHub token
 github_token = st.secrets.get("github_token", os.environ.get("GITHUB_TOKEN"))
 
+# Speculative prefetch of sources once a topic is entered, before Generate is clicked (opt-in)
+prefetch_enabled = str(st.secrets.get("SPECULATIVE_PREFETCH", "false")).lower() == "true"
+
+
+@st.cache_resource
+def get_prefetch_manager():
+    # One manager per process so the per-user cap holds across reruns and sessions
+    return PrefetchManager(
+        # Prefetches are speculative, so they yield API quota to interactive requests
+        lambda topic, checkpoint: gather_sources(topic, github_token=github_token, checkpoint=checkpoint,
+                                                 priority=BATCH),
+        debounce_seconds=float(st.secrets.get("PREFETCH_DEBOUNCE_SECONDS", 1.5)),
+        max_per_user=int(st.secrets.get("PREFETCH_MAX_PER_USER", 2)),
+    )
+
+
 # Session State initialization
 if 'logged_in' not in st.session_state:
     st.session_state.logged_in = False
@@ -58,33 +79,54 @@ def handle_signup(username, email, password):
 
 
 def handle_logout():
+    if prefetch_enabled:
+        get_prefetch_manager().cancel_user(st.session_state.username)
     st.session_state.logged_in = False
     st.session_state.username = ""
     set_page("home")
 
 
+def profiling_enabled():
+    # Either every request (PROFILE_REQUESTS secret) or a per-user admin flag in the users collection
+    if str(st.secrets.get("PROFILE_REQUESTS", "false")).lower() == "true":
+        return True
+    return bool(get_user_info(st.session_state.username).get("profile_requests"))
+
+
 def generate_and_save_proof(topic):
     # Show progress
     progress_bar = st.progress(0)
     status_text = st.empty()
 
-    # Step 1: Fetching sources
+    # Step 1: Fetching sources, unless a prefetch already did
     status_text.text("Fetching relevant sources...")
     progress_bar.progress(20)
-    time.sleep(0.5)  # Simulate processing time
-
-    github_sources = search_github(topic, github_token=github_token)
-    progress_bar.progress(40)
 
-    arxiv_sources = search_arxiv(topic)
+    sources = None
+    if prefetch_enabled:
+        # A prefetch runs at batch priority, so don't wait on it for long
+        sources = get_prefetch_manager().adopt(
+            st.session_state.username, topic,
+            timeout=float(st.secrets.get("PREFETCH_ADOPT_TIMEOUT_SECONDS", 10)),
+        )
+    if sources is None:
+        sources = gather_sources(topic, github_token=github_token, priority=INTERACTIVE)
+    github_sources = sources["github"]
+    arxiv_sources = sources["arxiv"]
     progress_bar.progress(60)
 
     # Step 2: Generating proof
     status_text.text("Generating proof with AI...")
     progress_bar.progress(80)
-    time.sleep(0.5)  # Simulate processing time
 
-    proof = generate_proof(topic)
+    try:
+        proof = generate_proof(topic, sources)
+    except GenerationError as e:
+        # Report the failure instead of evaluating and saving it as a proof
+        status_text.empty()
+        progress_bar.empty()
+        st.error(f"Proof generation failed: {e}")
+        return None
 
     # Step 3: Evaluating
     status_text.text("Evaluating proof quality...")
@@ -110,6 +152,7 @@ def generate_and_save_proof(topic):
             "generated_proof": proof,
             "clarity_score": clarity,
             "depth_score": depth,
+            "created_at": datetime.now(timezone.utc),
             "sources": {
                 "github": [{"title": src["title"], "url": src["url"], "readme": src["readme"]} for src in
                            github_sources],
@@ -379,8 +422,25 @@ def generate_proof_page():
 
     generate_button = st.button("Generate TurboProof 🚀", use_container_width=True)
 
+    if prefetch_enabled and topic and not generate_button:
+        get_prefetch_manager().schedule(st.session_state.username, topic)
+
     if generate_button and topic:
-        proof_data = generate_and_save_proof(topic)
+        profiler = nullcontext()
+        if profiling_enabled():
+            profiler = profile_request(
+                f"{st.session_state.username}-generate",
+                profiles_dir=st.secrets.get("PROFILES_DIR", "profiles"),
+                memory=str(st.secrets.get("PROFILE_MEMORY", "false")).lower() == "true",
+            )
+        with profiler as profile:
+            proof_data = generate_and_save_proof(topic)
+        if profile is not None:
+            st.caption(f"Profile written to {profile.prefix}.* ({profile.samples} samples, {profile.duration:.1f}s)")
+            if profile.memory_skipped:
+                st.caption("No memory snapshot: allocation tracing was stopped outside the profiler.")
+        if proof_data is None:
+            return
 
         # Display proof results
         st.markdown("<h2>📄 TurboProof Output</h2>", unsafe_allow_html=True)
@@ -432,9 +492,28 @@ def generate_proof_page():
 
 
 # History page
+def render_export_section():
+    with st.expander("📦 Export all my proofs"):
+        fmt = st.radio("Format", ["zip", "jsonl"], horizontal=True, key="export_format")
+        # Only build the export on request, not on every rerun of the page
+        if st.button("Prepare export", key="btn_prepare_export"):
+            with st.spinner("Exporting your proofs..."):
+                export_file = export_to_tempfile(projects_collection, st.session_state.username, fmt=fmt)
+            with export_file:
+                st.download_button(
+                    "Download export",
+                    data=export_file,
+                    file_name=f"turboproof-{st.session_state.username}.{'jsonl.zip' if fmt == 'zip' else 'jsonl'}",
+                    mime="application/zip" if fmt == "zip" else "application/jsonl",
+                    key="btn_download_export",
+                )
+
+
 def history_page():
     st.markdown("<h1 class='page-title'>My Proofs</h1>", unsafe_allow_html=True)
 
+    render_export_section()
+
     if not st.session_state.proof_history:
         st.info("You haven't generated any proofs yet.")
         if st.button("Generate your first proof", use_container_width=True):
@@ -0,0 +1,113 @@
+"""
+Compare embedding backends and index types.
+
+For every backend this reports encode throughput and the lowest cosine
+similarity to the fp32 reference; for every index type it reports index RAM
+and top-k retrieval agreement with the exact fp32 flat index. Queries are
+corpus documents; each query's own row is left out of its neighbours, and
+the corpus holds no duplicates, so agreement is not decided by exact ties.
+
+Usage:
+    python -m benchmarks.embedding_backends [--corpus FILE] [--queries N] [--k K]
+"""
+import argparse
+import itertools
+import random
+import time
+
+import numpy as np
+
+from utils.embedding_backends import (
+    BACKENDS,
+    INDEX_TYPES,
+    backend_agreement,
+    build_index,
+    index_memory_bytes,
+    load_embedding_model,
+)
+from utils.embedding_server import DEFAULT_MODEL_NAME
+
+
+def synthetic_corpus(size):
+    """Generate up to ``size`` distinct short technical sentences (at most 2000)."""
+    subjects = ["graph colouring", "quantum annealing", "gradient descent", "hash tables",
+                "elliptic curves", "transformer attention", "dynamic programming", "Markov chains"]
+    claims = ["converges in polynomial time", "admits a greedy approximation",
+              "is NP-hard in general", "has a closed-form solution", "is robust to noise"]
+    contexts = ["on sparse inputs", "under adversarial conditions", "for bounded degree",
+                "with high probability", "in the streaming model"]
+    methods = ["by a potential argument", "via a coupling", "using linear programming duality",
+               "through spectral bounds", "by reduction from 3-SAT", "using martingale concentration",
+               "via an exchange argument", "by induction on the input size", "through a union bound",
+               "using fixed-point iteration"]
+    sentences = [f"{s.capitalize()} {c} {x}, shown {m}."
+                 for s, c, x, m in itertools.product(subjects, claims, contexts, methods)]
+    random.Random(0).shuffle(sentences)  # Small corpora still cover every subject
+    return sentences[:size]
+
+
+def measure_throughput(model, texts):
+    start = time.perf_counter()
+    embeddings = np.asarray(model.encode(texts, batch_size=64), dtype="float32")
+    return embeddings, len(texts) / (time.perf_counter() - start)
+
+
+def search_neighbours(index, query_vectors, query_rows, k):
+    """Return the k nearest corpus rows of each query, excluding the query's own row."""
+    _, ids = index.search(query_vectors, k + 1)
+    return [[i for i in row if i != own][:k] for row, own in zip(ids, query_rows)]
+
+
+def topk_agreement(reference_ids, candidate_ids):
+    overlaps = [len(set(r) & set(c)) / len(r) for r, c in zip(reference_ids, candidate_ids)]
+    return float(np.mean(overlaps))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends and index types.")
+    parser.add_argument("--corpus", help="Text file with one document per line (default: synthetic)")
+    parser.add_argument("--size", type=int, default=2000, help="Synthetic corpus size (at most 2000)")
+    parser.add_argument("--queries", type=int, default=100, help="Number of corpus lines used as queries")
+    parser.add_argument("--k", type=int, default=3, help="Neighbours compared for agreement")
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME, help="Sentence-transformer model name")
+    args = parser.parse_args()
+
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8") as f:
+            texts = list(dict.fromkeys(line.strip() for line in f if line.strip()))
+    else:
+        texts = synthetic_corpus(args.size)
+    query_rows = list(range(0, len(texts), max(1, len(texts) // args.queries)))[: args.queries]
+    queries = [texts[i] for i in query_rows]
+
+    print(f"Corpus: {len(texts)} documents, {len(queries)} queries, k={args.k}\n")
+
+    reference = load_embedding_model(args.model, backend="torch")
+    reference_vectors, _ = measure_throughput(reference, texts)
+    reference_queries = np.asarray(reference.encode(queries), dtype="float32")
+    exact = build_index(reference_vectors, "flat")
+    reference_ids = search_neighbours(exact, reference_queries, query_rows, args.k)
+
+    print(f"{'backend':<8} {'texts/s':>10} {'min cosine':>11} {'top-k agreement':>16}")
+    for backend in BACKENDS:
+        try:
+            model = reference if backend == "torch" else load_embedding_model(args.model, backend=backend)
+        except Exception as e:
+            print(f"{backend:<8} unavailable: {e}")
+            continue
+        vectors, throughput = measure_throughput(model, texts)
+        cosine = backend_agreement(model, reference)
+        query_vectors = np.asarray(model.encode(queries), dtype="float32")
+        ids = search_neighbours(build_index(vectors, "flat"), query_vectors, query_rows, args.k)
+        print(f"{backend:<8} {throughput:>10.1f} {cosine:>11.4f} {topk_agreement(reference_ids, ids):>16.3f}")
+
+    print(f"\n{'index':<8} {'RAM (KiB)':>10} {'top-k agreement':>16}")
+    for index_type in INDEX_TYPES:
+        index = build_index(reference_vectors, index_type)
+        ids = search_neighbours(index, reference_queries, query_rows, args.k)
+        memory = index_memory_bytes(index) / 1024
+        print(f"{index_type:<8} {memory:>10.1f} {topk_agreement(reference_ids, ids):>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Measure the latency and top-3 precision of two-stage retrieval.
+
+Runs a small labelled corpus through bi-encoder retrieval alone, with
+cross-encoder reranking and with reranking plus MMR, and reports median and
+p95 search latency together with precision@3. Distractor documents share
+vocabulary with the queries but are about something else, which is where a
+cross-encoder helps.
+
+Usage:
+    python -m benchmarks.reranking [--candidates N] [--repeat R]
+"""
+import argparse
+import statistics
+import time
+
+from utils.reranker import Reranker
+from utils.vector_store import VectorStore
+
+# query -> (relevant documents, distractors sharing its vocabulary)
+LABELLED_QUERIES = {
+    "proof that Dijkstra's algorithm finds shortest paths": (
+        [
+            "Dijkstra's algorithm is correct for non-negative edge weights: by induction, every vertex removed from the priority queue has its final shortest-path distance.",
+            "We prove the invariant that settled vertices carry exact shortest path distances when Dijkstra's greedy selection extracts the minimum tentative distance.",
+            "A Python implementation of Dijkstra's shortest path algorithm using a binary heap, with a proof sketch of its correctness and O((V + E) log V) running time.",
+        ],
+        [
+            "Edsger Dijkstra's letter 'Go To Statement Considered Harmful' argued for structured programming.",
+            "Shortest path puzzles for kids: find the path through the maze in the fewest steps.",
+            "A proof that the algorithm of the dining philosophers avoids deadlock, also due to Dijkstra.",
+        ],
+    ),
+    "convergence of gradient descent for convex functions": (
+        [
+            "For an L-smooth convex function, gradient descent with step size 1/L converges at rate O(1/k) in function value.",
+            "We show that gradient descent on strongly convex objectives converges linearly, with a contraction factor depending on the condition number.",
+            "Convergence analysis of first-order methods: descent lemma, convexity inequality and telescoping sums give the sublinear rate.",
+        ],
+        [
+            "Descent of a mountain: how to plan a safe route down a steep gradient.",
+            "Convex mirrors are used on roads to widen the field of view at blind corners.",
+            "The function of the gradient boosting library is to train tree ensembles for tabular data.",
+        ],
+    ),
+    "security of lattice-based cryptography under learning with errors": (
+        [
+            "Regev's public-key encryption is secure assuming the hardness of the learning with errors problem, which reduces from worst-case lattice problems.",
+            "Learning with errors (LWE) asks to recover a secret from noisy linear equations; its hardness underpins many lattice-based cryptosystems.",
+            "We give a security proof for a lattice-based key exchange by reduction to decision ring-LWE.",
+        ],
+        [
+            "Lattice fences for the garden: installation guide and common errors to avoid.",
+            "Learning from errors in cryptography history: the Enigma machine and operator mistakes.",
+            "Security cameras with learning-based motion detection reduce false alarms.",
+        ],
+    ),
+    "why quicksort runs in O(n log n) expected time": (
+        [
+            "With uniformly random pivots, the expected number of comparisons made by quicksort is 2n ln n, since elements i and j are compared with probability 2/(j - i + 1).",
+            "Randomized quicksort's recursion tree has expected depth O(log n), and each level does O(n) partitioning work.",
+            "Analysis of quicksort: the expected running time over random pivot choices is O(n log n) even though the worst case is quadratic.",
+        ],
+        [
+            "Quick sort your laundry: a time-saving guide to organising clothes.",
+            "Time complexity cheat sheet: O(1), O(log n), O(n) and O(n^2) explained with examples.",
+            "Merge sort always runs in O(n log n) time and is stable.",
+        ],
+    ),
+}
+
+
+def build_store():
+    store = VectorStore()
+    docs, relevant = [], {}
+    for query, (positives, negatives) in LABELLED_QUERIES.items():
+        relevant[query] = set(positives)
+        docs.extend({"description": text} for text in positives + negatives)
+    store.add_documents(docs)
+    return store, relevant
+
+
+def run(store, relevant, repeat, **search_kwargs):
+    latencies, precisions = [], []
+    for _ in range(repeat):
+        for query, positives in relevant.items():
+            start = time.perf_counter()
+            results = store.search(query, k=3, **search_kwargs)
+            latencies.append((time.perf_counter() - start) * 1000)
+            precisions.append(sum(doc["description"] in positives for doc in results) / 3)
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+    return statistics.median(latencies), p95, statistics.mean(precisions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cross-encoder reranking.")
+    parser.add_argument("--candidates", type=int, default=20, help="Candidates fetched for reranking")
+    parser.add_argument("--mmr-lambda", type=float, default=0.7, help="MMR relevance/diversity trade-off")
+    parser.add_argument("--repeat", type=int, default=5, help="Passes over the query set")
+    args = parser.parse_args()
+
+    store, relevant = build_store()
+    reranker, cold_reranker = Reranker(), Reranker()
+    for model in (reranker, cold_reranker):
+        model.score("warm up", ["warm up"])  # Exclude model loading from the timings
+    store.search("warm up", k=3)
+
+    modes = {
+        "bi-encoder": {},
+        "rerank (cold cache)": {"reranker": cold_reranker, "candidates": args.candidates},
+        "rerank (warm cache)": {"reranker": reranker, "candidates": args.candidates},
+        "rerank + MMR": {"reranker": reranker, "candidates": args.candidates, "mmr_lambda": args.mmr_lambda},
+    }
+    run(store, relevant, 1, reranker=reranker, candidates=args.candidates)  # Fill the warm cache
+
+    print(f"{'mode':<22} {'median ms':>10} {'p95 ms':>8} {'P@3':>6}")
+    for name, kwargs in modes.items():
+        repeat = 1 if "cold" in name else args.repeat
+        median, p95, precision = run(store, relevant, repeat, **kwargs)
+        print(f"{name:<22} {median:>10.1f} {p95:>8.1f} {precision:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
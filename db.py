@@ -8,3 +8,4 @@ client = MongoClient(MONGO_URI)
 db = client["turbo_proof"]
 users_collection = db["users"]
 projects_collection = db["projects"]
+quotas_collection = db["quotas"]
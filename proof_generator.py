@@ -1,26 +1,125 @@
 import google.generativeai as genai
 import streamlit as st
-from utils.github_scraper import search_github
+from utils.github_scraper import ingest_repository, search_github
 from utils.arxiv_scraper import search_arxiv
+from utils.arxiv_fulltext import create_extract_pool, ingest_fulltext
+from utils.dedup import deduplicate_documents
+from utils.llm_client import GenerationClient
+from utils.quota import INTERACTIVE, acquire_quota
+from utils.reranker import Reranker
 from utils.vector_store import VectorStore
 
 # Configure the Google Generative AI client using Streamlit secrets
 genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
 
-def generate_proof(topic):
-    if st.secrets.get("DEBUG_MODE", "false").lower() == "true":
-        return "DEBUG_MODE is enabled. No proof generated."
+
+@st.cache_resource
+def get_generation_client():
+    # Shared across sessions so the latency percentile used for hedging is meaningful
+    hedge_model_name = st.secrets.get("GEMINI_HEDGE_MODEL")
+    return GenerationClient(
+        genai.GenerativeModel(st.secrets.get("GEMINI_MODEL", "gemini-1.5-flash")),
+        hedge_model=genai.GenerativeModel(hedge_model_name) if hedge_model_name else None,
+        deadline=float(st.secrets.get("GENERATION_DEADLINE_SECONDS", 60)),
+        max_retries=int(st.secrets.get("GENERATION_MAX_RETRIES", 3)),
+        hedge_percentile=float(st.secrets.get("HEDGE_LATENCY_PERCENTILE", 95)),
+        acquire_quota=lambda max_wait: acquire_quota("gemini", max_wait=max_wait),
+    )
+
+
+@st.cache_resource
+def get_reranker():
+    # Loaded once per process; its score cache is shared across sessions
+    return Reranker(st.secrets.get("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"))
+
+
+@st.cache_resource
+def get_extract_pool():
+    # One pool per process; starting workers on every proof would dominate small ingests
+    return create_extract_pool(int(st.secrets.get("ARXIV_FULLTEXT_WORKERS", 2)))
+
+
+def gather_sources(topic, github_token=None, checkpoint=None, priority=INTERACTIVE):
+    """
+    Fetch, deduplicate and embed the sources for a topic.
+
+    Args:
+        topic (str): The proof topic
+        github_token (str): Optional GitHub token passed to the scraper
+        checkpoint (callable): Called between the slow steps; a speculative
+            prefetch uses it to stop once its topic has been superseded
+        priority (str): Quota priority of the API calls, INTERACTIVE or BATCH
+
+    Returns:
+        dict: The GitHub results, the arXiv results and the populated vector store
+    """
+    checkpoint = checkpoint or (lambda: None)
 
     # Step 1: Fetch documents
-    github_results = search_github(topic)
+    github_results = search_github(topic, github_token=github_token, priority=priority)
+    checkpoint()
     arxiv_results = search_arxiv(topic)
+    checkpoint()
+
+    # Step 2: Drop forks and mirrors, then create and populate vector store
+    documents = deduplicate_documents(github_results + arxiv_results)
+    vector_store = VectorStore(
+        backend=st.secrets.get("EMBEDDING_BACKEND", "torch"),
+        index_type=st.secrets.get("VECTOR_INDEX_TYPE", "flat"),
+    )
+    vector_store.add_documents(documents)
+
+    # Step 2b (opt-in): Add code and docs of the top repositories to the store
+    if str(st.secrets.get("REPO_CODE_INGEST", "false")).lower() == "true":
+        top_repos = [doc for doc in documents if "full_name" in doc][:int(st.secrets.get("REPO_CODE_REPOS", 2))]
+        for repo in top_repos:
+            checkpoint()
+            ingest_repository(
+                repo,
+                vector_store,
+                max_files=int(st.secrets.get("REPO_CODE_MAX_FILES", 40)),
+                cache_dir=st.secrets.get("GITHUB_BLOB_CACHE_DIR", "data/github_blobs"),
+                priority=priority,
+            )
 
-    # Step 2: Create and populate vector store
-    vector_store = VectorStore()
-    vector_store.add_documents(github_results + arxiv_results)
+    # Step 2c (opt-in): Stream full-text passages of the top arXiv papers into the store
+    if str(st.secrets.get("ARXIV_FULLTEXT", "false")).lower() == "true":
+        checkpoint()
+        ingest_fulltext(
+            arxiv_results,
+            vector_store,
+            max_papers=int(st.secrets.get("ARXIV_FULLTEXT_PAPERS", 3)),
+            cache_dir=st.secrets.get("ARXIV_FULLTEXT_CACHE_DIR", "data/arxiv_fulltext"),
+            extract_pool=get_extract_pool(),
+            checkpoint=checkpoint,
+        )
+
+    return {"github": github_results, "arxiv": arxiv_results, "vector_store": vector_store}
+
+
+def generate_proof(topic, sources=None):
+    """
+    Generate a proof for a topic from its sources.
+
+    Raises:
+        GenerationError: If the model fails or misses its deadline
+    """
+    if st.secrets.get("DEBUG_MODE", "false").lower() == "true":
+        return "DEBUG_MODE is enabled. No proof generated."
+
+    if sources is None:
+        sources = gather_sources(topic)
 
     # Step 3: Search for relevant docs
-    relevant_docs = vector_store.search(topic, k=3)
+    rerank = str(st.secrets.get("RERANK", "false")).lower() == "true"
+    mmr_lambda = st.secrets.get("MMR_LAMBDA")
+    relevant_docs = sources["vector_store"].search(
+        topic,
+        k=3,
+        reranker=get_reranker() if rerank else None,
+        candidates=int(st.secrets.get("RERANK_CANDIDATES", 20)),
+        mmr_lambda=float(mmr_lambda) if mmr_lambda is not None else None,
+    )
     context = format_context(relevant_docs)
 
     # Step 4: Compose prompt
@@ -35,24 +134,23 @@ def generate_proof(topic):
     The proof should be thorough, well-structured, and include technical details.
     """
 
-    # Step 5: Use Gemini Flash 2.0 (Free Tier)
-    try:
-        genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
-        model = genai.GenerativeModel("gemini-1.5-flash")
-
-        response = model.generate_content(prompt)
-        return response.text
+    # Step 5: Generate with Gemini; failures raise GenerationError
+    return get_generation_client().generate(prompt)
 
-    except Exception as e:
-        return f"Error generating content: {e}"
-
-    return "Failed to generate content after multiple attempts due to rate limiting."
 
 def format_context(documents):
     """Formats document summaries into prompt context text."""
     context_parts = []
     for i, doc in enumerate(documents, 1):
-        if "readme" in doc:
+        if "passage" in doc:
+            context_parts.append(
+                f"Source {i} (arXiv full text): {doc['title']} by {doc['authors']}\nPassage: {doc['passage']}\n"
+            )
+        elif "code" in doc:
+            context_parts.append(
+                f"Source {i} (GitHub code): {doc['full_name']}/{doc['path']}\n{doc['code'][:500]}...\n"
+            )
+        elif "readme" in doc:
             context_parts.append(
                 f"Source {i} (GitHub): {doc['title']}\n{doc['description']}\nExcerpt from README: {doc['readme'][:500]}...\n"
             )
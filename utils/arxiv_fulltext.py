@@ -0,0 +1,235 @@
+"""
+Full-text arXiv passage ingestion.
+
+Downloads the PDFs of the top papers concurrently, extracts their text in a
+long-lived process pool so CPU-heavy parsing stays off the UI thread, splits it into
+passages and streams them into a ``VectorStore`` as each paper finishes.
+Extracted text and passage embeddings are cached on disk by arXiv ID and
+version (embeddings also by model and backend), so each paper is only
+downloaded, parsed and embedded once.
+"""
+import io
+import multiprocessing
+import os
+import re
+import signal
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import numpy as np
+import requests
+
+from utils.chunking import chunk_text
+
+DEFAULT_CACHE_DIR = "data/arxiv_fulltext"
+
+_ARXIV_ID_PATTERN = re.compile(r"arxiv\.org/(?:pdf|abs)/(.+?)(?:\.pdf)?$")
+
+
+def arxiv_cache_key(url):
+    """Return a filesystem-safe ``<id><version>`` key for an arXiv URL, or None."""
+    match = _ARXIV_ID_PATTERN.search(url or "")
+    if not match:
+        return None
+    return match.group(1).replace("/", "_")
+
+
+def _raise_timeout(signum, frame):
+    raise TimeoutError("PDF text extraction timed out.")
+
+
+def extract_pdf_text(pdf_bytes, timeout=None):
+    """
+    Extract the text of a PDF. Runs in a worker process.
+
+    With a ``timeout``, a pathological PDF raises TimeoutError instead of
+    holding its worker indefinitely (enforced with SIGALRM, so only when run on
+    the main thread, as in pool workers).
+    """
+    from pypdf import PdfReader
+
+    alarm = timeout and threading.current_thread() is threading.main_thread()
+    if alarm:
+        previous = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        return "\n".join(page.extract_text() or "" for page in reader.pages)
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+
+def create_extract_pool(workers=2):
+    """
+    Create a process pool for PDF text extraction.
+
+    Workers come from a fork server rather than being forked from the caller,
+    which may hold threads (Streamlit, torch) whose locks a forked child
+    would inherit mid-acquisition. Create the pool once and reuse it.
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("forkserver"))
+
+
+class FulltextCache:
+    """
+    Extracted text and passage embeddings on disk, keyed by arXiv ID and version.
+
+    Embeddings are additionally keyed by an ``embedding_key`` naming the model
+    and backend, since vectors from different backends must not share an index.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key, suffix):
+        return os.path.join(self.cache_dir, f"{key}{suffix}".replace("/", "_"))
+
+    def load_text(self, key):
+        path = self._path(key, ".txt")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    def save_text(self, key, text):
+        self._write_atomically(self._path(key, ".txt"), text.encode("utf-8"))
+
+    def load_embeddings(self, key, embedding_key):
+        path = self._path(key, f".{embedding_key}.npy")
+        return np.load(path) if os.path.exists(path) else None
+
+    def save_embeddings(self, key, embedding_key, embeddings):
+        buffer = io.BytesIO()
+        np.save(buffer, np.asarray(embeddings, dtype="float32"))
+        self._write_atomically(self._path(key, f".{embedding_key}.npy"), buffer.getvalue())
+
+    def _write_atomically(self, path, data):
+        # Concurrent sessions may cache the same paper; never expose a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def _download_pdf(session, url, timeout):
+    # requests' timeout bounds each read, not the whole body, so enforce a total
+    deadline = time.monotonic() + timeout
+    with session.get(url, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        chunks = []
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            chunks.append(chunk)
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Download of {url} took longer than {timeout:g}s.")
+    return b"".join(chunks)
+
+
+def ingest_fulltext(papers, vector_store, max_papers=3, cache_dir=DEFAULT_CACHE_DIR,
+                    download_workers=4, extract_pool=None, timeout=30, extract_timeout=60, checkpoint=None):
+    """
+    Add full-text passages of the top arXiv papers to a vector store.
+
+    Args:
+        papers (list): Paper dictionaries from ``search_arxiv``, best first
+        vector_store (VectorStore): Store that receives the passages
+        max_papers (int): Number of papers to ingest
+        cache_dir (str): Directory of the text and embedding cache
+        download_workers (int): Concurrent PDF downloads
+        extract_pool (ProcessPoolExecutor): Shared pool from ``create_extract_pool``; a
+            temporary one is created and shut down when omitted
+        timeout (float): Download timeout in seconds
+        extract_timeout (float): Seconds allowed to extract one PDF; slower papers are dropped
+        checkpoint (callable): Called as each paper finishes; may raise to stop early
+
+    Returns:
+        int: The number of passages added
+    """
+    cache = FulltextCache(cache_dir)
+    selected = [(arxiv_cache_key(p.get("pdf_url")), p) for p in papers[:max_papers]]
+    selected = [(key, paper) for key, paper in selected if key]
+    embedding_key = f"{vector_store.model_name}.{vector_store.backend}"
+    added = 0
+
+    def add_passages(key, paper, text):
+        passages = chunk_text(text)
+        if not passages:
+            return 0
+        docs = [{
+            "title": paper["title"],
+            "authors": paper["authors"],
+            "url": paper["url"],
+            "passage": passage,
+        } for passage in passages]
+
+        embeddings = cache.load_embeddings(key, embedding_key)
+        if embeddings is None or len(embeddings) != len(docs):
+            embeddings = vector_store.encode(passages)
+            cache.save_embeddings(key, embedding_key, embeddings)
+        vector_store.add_documents(docs, embeddings=embeddings)
+        if checkpoint:
+            checkpoint()
+        return len(docs)
+
+    to_fetch = []
+    for key, paper in selected:
+        text = cache.load_text(key)
+        if text is None:
+            to_fetch.append((key, paper))
+        else:
+            added += add_passages(key, paper, text)
+
+    if not to_fetch:
+        return added
+
+    extractors = extract_pool or create_extract_pool()
+    with requests.Session() as session, ThreadPoolExecutor(max_workers=download_workers) as downloads:
+        session.headers["User-Agent"] = "TurboProof/1.0 (full-text passage ingestion)"
+        pending = {}  # future -> (stage, key, paper, deadline)
+        for key, paper in to_fetch:
+            future = downloads.submit(_download_pdf, session, paper["pdf_url"], timeout)
+            pending[future] = ("download", key, paper, time.monotonic() + timeout + 5)
+
+        try:
+            while pending:
+                next_deadline = min(deadline for *_, deadline in pending.values())
+                done, _ = wait(pending, timeout=max(0.0, next_deadline - time.monotonic()),
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, key, paper, _ = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception:
+                        continue  # Skip papers whose PDF can't be fetched or parsed
+
+                    if stage == "download":
+                        future = extractors.submit(extract_pdf_text, result, extract_timeout)
+                        # The worker stops itself at extract_timeout; the grace covers queueing
+                        pending[future] = ("extract", key, paper, time.monotonic() + 2 * extract_timeout)
+                    else:
+                        try:
+                            cache.save_text(key, result)
+                        except OSError:
+                            pass  # The passages are still usable without the cache
+                        added += add_passages(key, paper, result)
+
+                now = time.monotonic()
+                for future, (_, _, _, deadline) in list(pending.items()):
+                    if deadline <= now:
+                        future.cancel()  # Drop papers that hang
+                        del pending[future]
+        finally:
+            for future in pending:
+                future.cancel()
+            if extract_pool is None:
+                extractors.shutdown(wait=False, cancel_futures=True)
+
+    return added
@@ -0,0 +1,372 @@
+"""
+Local arXiv metadata mirror.
+
+Loads the arXiv metadata bulk snapshot (the JSON-lines dump with one paper
+per line: id, title, abstract, authors, categories, versions, update_date,
+...) into SQLite with an FTS5 lexical index, plus an optional FAISS
+embedding index over the abstracts. ``search_arxiv`` queries the mirror in
+milliseconds and only asks the live API for papers newer than the snapshot.
+
+Ingest or update the mirror with:
+    python -m utils.arxiv_mirror ingest arxiv-metadata-oai-snapshot.json --embed
+
+Re-running ingest on a newer dump applies only new or updated records.
+With --embed, every record whose abstract is not yet in the embedding index
+is embedded, so an interrupted run or a mirror first ingested without
+--embed is completed by the next run.
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+from email.utils import parsedate_to_datetime
+
+import numpy as np
+
+DEFAULT_MIRROR_PATH = "data/arxiv_mirror.sqlite"
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+# Words that match nearly every abstract and would make lexical search rank the whole corpus
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "into", "is", "it",
+    "its", "of", "on", "or", "over", "that", "the", "their", "this", "to", "under", "using", "via",
+    "what", "when", "which", "why", "with",
+}
+
+# papers.embedded: never embedded, embedded, or possibly holding an outdated vector
+_NOT_EMBEDDED, _EMBEDDED, _STALE = 0, 1, 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    id TEXT PRIMARY KEY,
+    version TEXT,
+    title TEXT,
+    abstract TEXT,
+    authors TEXT,
+    categories TEXT,
+    comments TEXT,
+    published TEXT,
+    update_date TEXT,
+    embedded INTEGER NOT NULL DEFAULT 0
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(title, abstract);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def _clean(text):
+    return " ".join((text or "").split())
+
+
+def _parse_record(record):
+    versions = record.get("versions") or []
+    published = "Unknown"
+    if versions:
+        try:
+            published = parsedate_to_datetime(versions[0]["created"]).strftime("%Y-%m-%d")
+        except (KeyError, TypeError, ValueError):
+            pass
+
+    return {
+        "id": record["id"],
+        "version": versions[-1]["version"] if versions else "",
+        "title": _clean(record.get("title")),
+        "abstract": _clean(record.get("abstract")),
+        "authors": _clean(record.get("authors")),
+        "categories": ", ".join((record.get("categories") or "").split()),
+        "comments": record.get("comments"),
+        "published": published,
+        "update_date": record.get("update_date") or "",
+    }
+
+
+def _fts_queries(query):
+    """Return the AND and OR forms of a query's significant tokens, or None when it has none."""
+    tokens = list(dict.fromkeys(_TOKEN_PATTERN.findall(query.lower())))
+    tokens = [token for token in tokens if token not in _STOPWORDS] or tokens
+    if not tokens:
+        return None
+    # Quote every token so user input can't be parsed as FTS5 syntax
+    quoted = [f'"{token}"' for token in tokens]
+    return " AND ".join(quoted), " OR ".join(quoted)
+
+
+class ArxivMirror:
+    """
+    SQLite-backed arXiv metadata store with lexical and embedding search.
+
+    Args:
+        path (str): SQLite database path; the embedding index lives next to it
+        vector_store: Optional ``VectorStore`` used to encode abstracts and queries
+    """
+
+    def __init__(self, path=DEFAULT_MIRROR_PATH, vector_store=None):
+        self.path = path
+        self.index_path = os.path.splitext(path)[0] + ".faiss"
+        self.vector_store = vector_store
+        self._index = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(papers)")}
+            if "embedded" not in columns:
+                # Mirrors created before embeddings were tracked are re-embedded once
+                conn.execute("ALTER TABLE papers ADD COLUMN embedded INTEGER NOT NULL DEFAULT 0")
+                if os.path.exists(self.index_path):
+                    conn.execute("UPDATE papers SET embedded = ?", (_STALE,))
+
+    def _connect(self):
+        return sqlite3.connect(self.path)
+
+    @property
+    def index(self):
+        if self._index is None and os.path.exists(self.index_path):
+            import faiss
+
+            self._index = faiss.read_index(self.index_path)
+        return self._index
+
+    def snapshot_date(self):
+        """Return the newest ``update_date`` in the mirror, or None when it is empty."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'snapshot_date'").fetchone()
+        return row[0] if row else None
+
+    def ingest(self, path, embed=False, batch_size=1000):
+        """
+        Load a JSON-lines metadata dump, applying only new or updated records.
+
+        Args:
+            path (str): Path of the JSON-lines snapshot
+            embed (bool): Afterwards, embed every abstract not yet in the embedding index
+            batch_size (int): Records written per transaction
+
+        Returns:
+            int: The number of records inserted or updated
+        """
+        applied = 0
+        batch = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    batch.append(_parse_record(json.loads(line)))
+                if len(batch) >= batch_size:
+                    applied += self._apply_batch(batch)
+                    batch = []
+        if batch:
+            applied += self._apply_batch(batch)
+
+        if embed:
+            self.embed_pending(batch_size=batch_size)
+        return applied
+
+    def embed_pending(self, batch_size=1000, checkpoint_every=50000):
+        """
+        Add every paper whose abstract is not yet embedded to the embedding index.
+
+        The index is written to disk every ``checkpoint_every`` papers and only
+        then are those papers marked as embedded, so an interrupted run resumes
+        where the last checkpoint left off. Old vectors are only removed for
+        papers that may already have one, since every removal scans the index.
+
+        Returns:
+            int: The number of papers embedded
+        """
+        import faiss
+
+        embedded = 0
+        done = []
+        last_rowid = -1
+        while True:
+            with self._connect() as conn:
+                batch = conn.execute(
+                    "SELECT rowid, title, abstract, embedded FROM papers WHERE embedded != ? AND rowid > ? "
+                    "ORDER BY rowid LIMIT ?",
+                    (_EMBEDDED, last_rowid, batch_size),
+                ).fetchall()
+            if batch:
+                self._embed(
+                    [row[0] for row in batch],
+                    [f"{title}. {abstract}" for _, title, abstract, _ in batch],
+                    replaced=[row[0] for row in batch if row[3] == _STALE],
+                )
+                done.extend(row[0] for row in batch)
+                embedded += len(batch)
+                last_rowid = batch[-1][0]
+            if done and (len(done) >= checkpoint_every or len(batch) < batch_size):
+                # Flag the papers as possibly in the index first, so a crash between
+                # writing the index and flagging them can't duplicate their vectors
+                self._set_embedded(done, _STALE)
+                faiss.write_index(self._index, self.index_path)
+                self._set_embedded(done, _EMBEDDED)
+                done = []
+            if len(batch) < batch_size:
+                break
+        return embedded
+
+    def _set_embedded(self, rowids, state):
+        with self._connect() as conn:
+            conn.executemany("UPDATE papers SET embedded = ? WHERE rowid = ?", [(state, rowid) for rowid in rowids])
+
+    def _apply_batch(self, records):
+        with self._connect() as conn:
+            placeholders = ",".join("?" * len(records))
+            known = dict(conn.execute(
+                f"SELECT id, update_date FROM papers WHERE id IN ({placeholders})",
+                [r["id"] for r in records],
+            ))
+            fresh = [r for r in records if r["id"] not in known or r["update_date"] > known[r["id"]]]
+            if not fresh:
+                return 0
+
+            for r in fresh:
+                rowid = conn.execute(
+                    """
+                    INSERT INTO papers (id, version, title, abstract, authors, categories, comments,
+                                        published, update_date)
+                    VALUES (:id, :version, :title, :abstract, :authors, :categories, :comments,
+                            :published, :update_date)
+                    ON CONFLICT(id) DO UPDATE SET
+                        version = excluded.version, title = excluded.title, abstract = excluded.abstract,
+                        authors = excluded.authors, categories = excluded.categories,
+                        comments = excluded.comments, published = excluded.published,
+                        update_date = excluded.update_date,
+                        embedded = CASE WHEN papers.embedded = 0 THEN 0 ELSE 2 END
+                    RETURNING rowid
+                    """,
+                    r,
+                ).fetchone()[0]
+                conn.execute("DELETE FROM papers_fts WHERE rowid = ?", (rowid,))
+                conn.execute("INSERT INTO papers_fts (rowid, title, abstract) VALUES (?, ?, ?)",
+                             (rowid, r["title"], r["abstract"]))
+
+            newest = max(r["update_date"] for r in fresh)
+            conn.execute(
+                """
+                INSERT INTO meta (key, value) VALUES ('snapshot_date', ?)
+                ON CONFLICT(key) DO UPDATE SET value = max(value, excluded.value)
+                """,
+                (newest,),
+            )
+        return len(fresh)
+
+    def _encode(self, texts):
+        if self.vector_store is None:
+            from utils.vector_store import VectorStore
+
+            self.vector_store = VectorStore()
+        return np.ascontiguousarray(self.vector_store.encode(texts), dtype="float32")
+
+    def _embed(self, rowids, texts, replaced=()):
+        import faiss
+
+        vectors = self._encode(texts)
+        if self.index is None:
+            self._index = faiss.IndexIDMap2(
+                faiss.IndexScalarQuantizer(vectors.shape[1], faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2)
+            )
+        elif replaced:
+            self._index.remove_ids(np.asarray(replaced, dtype="int64"))  # Updated papers replace their old vectors
+        self._index.add_with_ids(vectors, np.asarray(rowids, dtype="int64"))
+
+    def search(self, query, max_results=5):
+        """
+        Search the mirror lexically and, when an embedding index exists, semantically.
+
+        Results from both indexes are merged with reciprocal rank fusion.
+
+        Returns:
+            list: Paper dictionaries in the same format as ``search_arxiv``
+        """
+        candidates = max_results * 4
+        rankings = []
+
+        fts_queries = _fts_queries(query)
+        if fts_queries:
+            # Papers matching every term first; the broader OR query only tops up a short list
+            lexical = []
+            with self._connect() as conn:
+                for fts_query in fts_queries:
+                    for (rowid,) in conn.execute(
+                        "SELECT rowid FROM papers_fts WHERE papers_fts MATCH ? ORDER BY bm25(papers_fts) LIMIT ?",
+                        (fts_query, candidates),
+                    ):
+                        if rowid not in lexical:
+                            lexical.append(rowid)
+                    if len(lexical) >= candidates:
+                        break
+            rankings.append(lexical[:candidates])
+
+        if self.index is not None:
+            query_vec = self._encode([query]).reshape(1, -1)
+            _, ids = self.index.search(query_vec, candidates)
+            rankings.append([int(i) for i in ids[0] if i >= 0])
+
+        scores = {}
+        for ranking in rankings:
+            for rank, rowid in enumerate(ranking):
+                scores[rowid] = scores.get(rowid, 0.0) + 1.0 / (60 + rank)
+        best = sorted(scores, key=scores.get, reverse=True)[:max_results]
+        if not best:
+            return []
+
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            placeholders = ",".join("?" * len(best))
+            rows = {row["rowid"]: row for row in conn.execute(
+                f"SELECT rowid, * FROM papers WHERE rowid IN ({placeholders})", best
+            )}
+        return [format_mirror_paper(rows[rowid]) for rowid in best if rowid in rows]
+
+
+def format_mirror_paper(row):
+    """Convert a mirror row to the paper dictionary returned by ``search_arxiv``."""
+    summary = row["abstract"]
+    if len(summary) > 500:
+        summary = summary[:500] + "..."
+
+    versioned_id = f"{row['id']}{row['version']}"
+    return {
+        "title": row["title"],
+        "summary": summary,
+        "url": f"http://arxiv.org/abs/{versioned_id}",
+        "pdf_url": f"http://arxiv.org/pdf/{versioned_id}",
+        "authors": row["authors"],
+        "published": row["published"],
+        "categories": row["categories"],
+        "comment": row["comments"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the local arXiv metadata mirror.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest = subparsers.add_parser("ingest", help="Load new or updated records from a JSON-lines dump")
+    ingest.add_argument("snapshot", help="Path of the arXiv metadata JSON-lines snapshot")
+    ingest.add_argument("--mirror", default=DEFAULT_MIRROR_PATH, help="SQLite mirror path")
+    ingest.add_argument("--embed", action="store_true",
+                        help="Embed every abstract not yet in the vector index")
+
+    search = subparsers.add_parser("search", help="Query the mirror")
+    search.add_argument("query")
+    search.add_argument("--mirror", default=DEFAULT_MIRROR_PATH, help="SQLite mirror path")
+    search.add_argument("--max-results", type=int, default=5)
+
+    args = parser.parse_args()
+    mirror = ArxivMirror(args.mirror)
+
+    if args.command == "ingest":
+        applied = mirror.ingest(args.snapshot, embed=args.embed)
+        print(f"Applied {applied} new or updated records; snapshot date {mirror.snapshot_date()}")
+    else:
+        for paper in mirror.search(args.query, max_results=args.max_results):
+            print(f"{paper['published']}  {paper['title']}  {paper['url']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,31 @@
 import arxiv
+import os
+import re
 import streamlit as st
-import time
 from datetime import datetime
 
+from utils.arxiv_mirror import ArxivMirror
+
+
+@st.cache_resource
+def get_arxiv_mirror():
+    """Return the local arXiv mirror if one has been ingested, otherwise None."""
+    path = st.secrets.get("ARXIV_MIRROR_PATH")
+    if not path or not os.path.exists(path):
+        return None
+    return ArxivMirror(path)
+
 
 def search_arxiv(query, max_results=5):
     """
     Search arXiv for papers related to the query.
 
+    When a local mirror is configured it answers the query. The live API is
+    only asked for papers submitted after the mirror's snapshot when the mirror
+    found fewer than ``max_results`` papers or the snapshot is older than
+    ``ARXIV_LIVE_MAX_AGE_DAYS``, so a fresh mirror serves requests without
+    touching the throttled API.
+
     Args:
         query (str): The search query for arXiv papers
         max_results (int): Maximum number of results to return
@@ -15,7 +33,60 @@ def search_arxiv(query, max_results=5):
     Returns:
         list: A list of dictionaries containing paper information
     """
+    mirror = get_arxiv_mirror()
+    if mirror is None:
+        return search_arxiv_live(query, max_results=max_results)
+
+    try:
+        mirrored = mirror.search(query, max_results=max_results)
+    except Exception as e:
+        st.error(f"Error searching the local arXiv mirror: {str(e)}")
+        return search_arxiv_live(query, max_results=max_results)
+
+    snapshot_date = mirror.snapshot_date()
+    recent = []
+    if snapshot_date and _needs_live_results(mirrored, max_results, snapshot_date):
+        # Leave room for papers the snapshot can't know about yet
+        recent = search_arxiv_live(query, max_results=max(1, max_results // 2), submitted_after=snapshot_date)
+
+    known_ids = {_unversioned(paper["url"]) for paper in recent}
+    mirrored = [paper for paper in mirrored if _unversioned(paper["url"]) not in known_ids]
+    return (recent + mirrored[:max_results - len(recent)])[:max_results]
+
+
+def _needs_live_results(mirrored, max_results, snapshot_date):
+    if str(st.secrets.get("ARXIV_LIVE_RECENT", "true")).lower() != "true":
+        return False
+    if len(mirrored) < max_results:
+        return True
     try:
+        age = datetime.now() - datetime.strptime(snapshot_date, "%Y-%m-%d")
+    except ValueError:
+        return True
+    return age.days > int(st.secrets.get("ARXIV_LIVE_MAX_AGE_DAYS", 7))
+
+
+def _unversioned(url):
+    return re.sub(r"v\d+$", "", url.split("/abs/")[-1])
+
+
+def search_arxiv_live(query, max_results=5, submitted_after=None):
+    """
+    Search the live arXiv API.
+
+    Args:
+        query (str): The search query for arXiv papers
+        max_results (int): Maximum number of results to return
+        submitted_after (str): Only return papers submitted after this YYYY-MM-DD date
+
+    Returns:
+        list: A list of dictionaries containing paper information
+    """
+    try:
+        if submitted_after:
+            start = submitted_after.replace("-", "")
+            query = f"({query}) AND submittedDate:[{start}0000 TO 299912312359]"
+
         # Configure arXiv search client
         search = arxiv.Search(
             query=query,
@@ -52,9 +123,6 @@ def search_arxiv(query, max_results=5):
 
             results.append(paper_info)
 
-            # Small delay to avoid overwhelming the service
-            time.sleep(0.1)
-
         return results
 
     except Exception as e:
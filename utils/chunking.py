@@ -0,0 +1,53 @@
+def chunk_text(text, chunk_words=200, overlap_words=40, min_words=30):
+    """
+    Split text into overlapping passages of roughly equal length.
+
+    Args:
+        text (str): The text to split
+        chunk_words (int): Words per passage
+        overlap_words (int): Words shared by consecutive passages
+        min_words (int): Trailing passages shorter than this are dropped
+
+    Returns:
+        list: The passages, in document order
+    """
+    words = text.split()
+    if not words:
+        return []
+
+    step = max(1, chunk_words - overlap_words)
+    passages = []
+    for start in range(0, len(words), step):
+        window = words[start:start + chunk_words]
+        if passages and len(window) < min_words:
+            break
+        passages.append(" ".join(window))
+        if start + chunk_words >= len(words):
+            break
+    return passages
+
+
+def chunk_lines(text, chunk_lines=60, overlap_lines=10):
+    """
+    Split source code into overlapping passages of whole lines.
+
+    Unlike ``chunk_text`` this keeps line breaks and indentation intact.
+
+    Args:
+        text (str): The source text
+        chunk_lines (int): Lines per passage
+        overlap_lines (int): Lines shared by consecutive passages
+
+    Returns:
+        list: The passages, in file order; blank passages are dropped
+    """
+    lines = text.splitlines()
+    step = max(1, chunk_lines - overlap_lines)
+    passages = []
+    for start in range(0, len(lines), step):
+        passage = "\n".join(lines[start:start + chunk_lines])
+        if passage.strip():
+            passages.append(passage)
+        if start + chunk_lines >= len(lines):
+            break
+    return passages
@@ -0,0 +1,117 @@
+"""
+Near-duplicate elimination for fetched sources.
+
+GitHub searches for popular topics return forks and mirrors with almost
+identical READMEs. Documents are reduced to MinHash signatures over word
+shingles, candidate pairs are found with locality-sensitive hashing (bands of
+signature rows), and each cluster of near-identical documents is collapsed to
+one canonical representative. The whole pass runs in roughly linear time.
+"""
+import re
+import zlib
+
+import numpy as np
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_TOKEN_PATTERN = re.compile(r"\w+")
+_TEXT_FIELDS = ("passage", "code", "readme", "summary", "description")
+# Filled in by the GitHub scraper when a repository has no README or description;
+# identical placeholders would otherwise make unrelated repositories look like duplicates
+PLACEHOLDER_TEXTS = {"No README found.", "No description available."}
+
+
+def document_text(doc):
+    """Return the text of a source document that gets embedded, skipping scraper placeholders."""
+    for field in _TEXT_FIELDS:
+        text = doc.get(field)
+        if text and text not in PLACEHOLDER_TEXTS:
+            return text
+    return ""
+
+
+def _shingle_hashes(text, shingle_size):
+    tokens = _TOKEN_PATTERN.findall(text.lower())
+    if len(tokens) <= shingle_size:
+        shingles = {" ".join(tokens)}
+    else:
+        shingles = {" ".join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)}
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+class MinHasher:
+    """Computes MinHash signatures with a fixed family of hash permutations."""
+
+    def __init__(self, num_perm=128, shingle_size=5, seed=1):
+        rng = np.random.default_rng(seed)
+        # Coefficients below 2**31 keep a * hash + b inside uint64 for 32-bit hashes
+        self.a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+
+    def signature(self, text):
+        hashes = _shingle_hashes(text, self.shingle_size)
+        permuted = (np.outer(hashes, self.a) + self.b) % _MERSENNE_PRIME
+        return permuted.min(axis=0)
+
+
+def _find(parents, i):
+    while parents[i] != i:
+        parents[i] = parents[parents[i]]
+        i = parents[i]
+    return i
+
+
+def _canonical_rank(doc, text, position):
+    # Prefer the most-starred repository, then the longest text, then the first seen
+    return (doc.get("stars") or 0, len(text), -position)
+
+
+def deduplicate_documents(docs, threshold=0.8, num_perm=128, bands=16, shingle_size=5):
+    """
+    Collapse near-identical documents to one canonical representative each.
+
+    Args:
+        docs (list): Source documents (GitHub repositories and arXiv papers)
+        threshold (float): Estimated Jaccard similarity above which two documents are duplicates
+        num_perm (int): Number of MinHash permutations
+        bands (int): Number of LSH bands; ``num_perm`` must be divisible by it
+        shingle_size (int): Words per shingle
+
+    Returns:
+        list: The canonical documents, in their original order
+    """
+    if num_perm % bands:
+        raise ValueError("num_perm must be divisible by bands.")
+
+    texts = [document_text(doc) for doc in docs]
+    candidates = [i for i, text in enumerate(texts) if text]
+    if len(candidates) < 2:
+        return list(docs)
+
+    hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size)
+    signatures = {i: hasher.signature(texts[i]) for i in candidates}
+    parents = {i: i for i in candidates}
+    rows = num_perm // bands
+
+    for band in range(bands):
+        buckets = {}
+        for i in candidates:
+            key = signatures[i][band * rows:(band + 1) * rows].tobytes()
+            first = buckets.setdefault(key, i)
+            if first == i:
+                continue
+            # Comparing against the bucket's first member keeps this pass linear
+            root_i, root_first = _find(parents, i), _find(parents, first)
+            if root_i != root_first and np.mean(signatures[i] == signatures[first]) >= threshold:
+                parents[root_i] = root_first
+
+    representatives = {}
+    for i in candidates:
+        root = _find(parents, i)
+        best = representatives.get(root)
+        if best is None or _canonical_rank(docs[i], texts[i], i) > _canonical_rank(docs[best], texts[best], best):
+            representatives[root] = i
+
+    keep = set(representatives.values())
+    return [doc for i, doc in enumerate(docs) if i in keep or not texts[i]]
@@ -0,0 +1,124 @@
+"""
+Selectable embedding backends and compact FAISS index types.
+
+Backends:
+    torch  - the reference fp32 PyTorch model
+    int8   - the same model with its Linear layers dynamically quantized to int8
+    onnx   - an ONNX Runtime export of the model (needs ``optimum[onnxruntime]``)
+
+Index types:
+    flat   - exact fp32 L2 index
+    fp16   - scalar quantizer storing each component as float16 (half the RAM)
+    sq8    - 8-bit scalar quantizer (a quarter of the RAM, needs training)
+"""
+import faiss
+import numpy as np
+
+BACKENDS = ("torch", "int8", "onnx")
+INDEX_TYPES = ("flat", "fp16", "sq8")
+
+# Small, varied sample used to check a backend against the fp32 reference
+CALIBRATION_TEXTS = [
+    "A proof by induction on the number of vertices of the graph.",
+    "Quantum error correction with surface codes.",
+    "Convergence guarantees for stochastic gradient descent on convex losses.",
+    "An implementation of Dijkstra's shortest path algorithm in Python.",
+    "Lattice-based cryptography and the learning with errors problem.",
+    "Attention is all you need: transformers for sequence modelling.",
+    "Fast Fourier transform over finite fields.",
+    "README: install the package with pip and run the examples.",
+]
+
+_SCALAR_QUANTIZERS = {
+    "fp16": "QT_fp16",
+    "sq8": "QT_8bit",
+}
+
+
+def load_embedding_model(model_name, backend="torch", verify=False, min_cosine=0.99):
+    """
+    Load a sentence-transformer model with the requested backend.
+
+    Args:
+        model_name (str): Sentence-transformer model name
+        backend (str): One of BACKENDS
+        verify (bool): Check the backend's outputs against the fp32 model
+        min_cosine (float): Lowest acceptable cosine similarity when verifying
+
+    Returns:
+        SentenceTransformer: A model exposing ``encode``
+    """
+    from sentence_transformers import SentenceTransformer
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Choose one of {', '.join(BACKENDS)}.")
+
+    if backend == "onnx":
+        model = SentenceTransformer(model_name, device="cpu", backend="onnx")
+    else:
+        model = SentenceTransformer(model_name, device="cpu")
+
+    if backend == "int8":
+        import torch
+
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    if verify and backend != "torch":
+        reference = SentenceTransformer(model_name, device="cpu")
+        agreement = backend_agreement(model, reference)
+        if agreement < min_cosine:
+            raise ValueError(
+                f"The {backend} backend disagrees with fp32 (min cosine {agreement:.4f} < {min_cosine})."
+            )
+
+    return model
+
+
+def backend_agreement(model, reference, texts=None):
+    """Return the lowest cosine similarity between two models' embeddings of the same texts."""
+    texts = texts or CALIBRATION_TEXTS
+    candidate = np.asarray(model.encode(texts), dtype="float32")
+    expected = np.asarray(reference.encode(texts), dtype="float32")
+
+    candidate /= np.linalg.norm(candidate, axis=1, keepdims=True)
+    expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+    return float(np.min(np.sum(candidate * expected, axis=1)))
+
+
+def build_index(vectors, index_type="flat"):
+    """
+    Build a FAISS L2 index of the requested type holding ``vectors``.
+
+    Args:
+        vectors (numpy.ndarray): A float32 matrix with one row per document
+        index_type (str): One of INDEX_TYPES
+
+    Returns:
+        faiss.Index: The populated index
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}'. Choose one of {', '.join(INDEX_TYPES)}.")
+
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    dim = vectors.shape[1]
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dim)
+    else:
+        quantizer = getattr(faiss.ScalarQuantizer, _SCALAR_QUANTIZERS[index_type])
+        index = faiss.IndexScalarQuantizer(dim, quantizer, faiss.METRIC_L2)
+        if not index.is_trained:
+            index.train(vectors)
+
+    index.add(vectors)
+    return index
+
+
+def index_requires_training(index_type):
+    """Whether an index type learns its encoding from the vectors it holds."""
+    return index_type == "sq8"
+
+
+def index_memory_bytes(index):
+    """Approximate memory held by an index, measured as its serialized size."""
+    return int(faiss.serialize_index(index).nbytes)
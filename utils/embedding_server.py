@@ -0,0 +1,235 @@
+"""
+Host-local embedding service.
+
+Every Streamlit process on a node would otherwise load its own copy of the
+sentence-transformer model and encode each session's handful of texts alone.
+This module runs a single model behind a Unix domain socket, gathers the
+encode requests of all connected sessions and processes into micro-batches,
+and exposes a small client used transparently by ``VectorStore``.
+
+Run the server with:
+    python -m utils.embedding_server --socket /tmp/turboproof-embed.sock
+"""
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
+DEFAULT_SOCKET_PATH = "/tmp/turboproof-embed.sock"
+SOCKET_ENV_VAR = "TURBOPROOF_EMBEDDING_SOCKET"
+
+_HEADER = struct.Struct("!I")
+
+
+def default_socket_path():
+    """Return the socket path from the environment, or the default one."""
+    return os.environ.get(SOCKET_ENV_VAR, DEFAULT_SOCKET_PATH)
+
+
+def _send_message(sock, payload):
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(min(remaining, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Embedding server closed the connection.")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv_message(sock):
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return _recv_exact(sock, size)
+
+
+class _PendingRequest:
+    """A single client's texts waiting to be encoded as part of a batch."""
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.done = threading.Event()
+        self.embeddings = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    Collects encode requests from many connections into micro-batches.
+
+    A batch is flushed as soon as it holds ``max_batch_size`` texts or the
+    oldest request in it has waited ``max_wait_ms`` milliseconds.
+    """
+
+    def __init__(self, encode_fn, max_batch_size=64, max_wait_ms=10):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, texts):
+        """Block until ``texts`` have been encoded and return their embeddings."""
+        request = _PendingRequest(texts)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.embeddings
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        size = len(batch[0].texts)
+        deadline = time.monotonic() + self.max_wait
+
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.texts)
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            texts = [text for request in batch for text in request.texts]
+            try:
+                embeddings = np.asarray(self.encode_fn(texts), dtype="float32")
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+                    request.done.set()
+                continue
+
+            offset = 0
+            for request in batch:
+                request.embeddings = embeddings[offset:offset + len(request.texts)]
+                offset += len(request.texts)
+                request.done.set()
+
+
+class _EncodeHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server
+        try:
+            request = json.loads(_recv_message(self.request).decode("utf-8"))
+            if request.get("model") != server.model_name:
+                raise ValueError(f"Server holds {server.model_name}, not {request.get('model')}.")
+            if request.get("backend", "torch") != server.backend:
+                raise ValueError(f"Server runs the {server.backend} backend, not {request.get('backend')}.")
+
+            embeddings = server.batcher.submit(list(request["texts"]))
+            header = {"shape": list(embeddings.shape)}
+            payload = embeddings.tobytes()
+        except Exception as e:
+            header = {"error": str(e)}
+            payload = b""
+
+        try:
+            _send_message(self.request, json.dumps(header).encode("utf-8"))
+            _send_message(self.request, payload)
+        except OSError:
+            pass  # The client gave up waiting; nothing left to do
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded Unix socket server that shares one model between all clients."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, model, model_name=DEFAULT_MODEL_NAME, backend="torch",
+                 max_batch_size=64, max_wait_ms=10):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.model_name = model_name
+        self.backend = backend
+        self.batcher = MicroBatcher(
+            lambda texts: model.encode(texts, batch_size=max_batch_size),
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+        )
+        super().__init__(socket_path, _EncodeHandler)
+        os.chmod(socket_path, 0o660)
+
+
+def encode_remote(texts, socket_path=None, model_name=DEFAULT_MODEL_NAME, backend="torch", timeout=30.0):
+    """
+    Encode texts through the local embedding server.
+
+    Args:
+        texts (list): Texts to encode
+        socket_path (str): Path of the server's Unix socket
+        model_name (str): Model the caller expects the server to hold
+        backend (str): Embedding backend the caller expects the server to run
+        timeout (float): Socket timeout in seconds
+
+    Returns:
+        numpy.ndarray: A float32 matrix with one row per text, or None when the
+        server is unavailable or cannot serve the request
+    """
+    socket_path = socket_path or default_socket_path()
+    if not os.path.exists(socket_path):
+        return None
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(socket_path)
+            request = {"model": model_name, "backend": backend, "texts": list(texts)}
+            _send_message(sock, json.dumps(request).encode("utf-8"))
+
+            header = json.loads(_recv_message(sock).decode("utf-8"))
+            payload = _recv_message(sock)
+    except (OSError, ValueError, ConnectionError):
+        return None
+
+    if "error" in header:
+        return None
+    return np.frombuffer(payload, dtype="float32").reshape(header["shape"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve sentence embeddings over a Unix socket.")
+    parser.add_argument("--socket", default=default_socket_path(), help="Unix socket path")
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME, help="Sentence-transformer model name")
+    parser.add_argument("--backend", default="torch", help="Embedding backend: torch, int8 or onnx")
+    parser.add_argument("--verify", action="store_true", help="Check the backend against the fp32 model on startup")
+    parser.add_argument("--max-batch-size", type=int, default=64, help="Maximum texts per batch")
+    parser.add_argument("--max-wait-ms", type=float, default=10, help="Maximum time a request waits for a batch")
+    args = parser.parse_args()
+
+    from utils.embedding_backends import load_embedding_model
+
+    model = load_embedding_model(args.model, backend=args.backend, verify=args.verify)
+    server = EmbeddingServer(args.socket, model, model_name=args.model, backend=args.backend,
+                             max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    print(f"Serving {args.model} ({args.backend}) on {args.socket}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,40 @@
 import requests
 import base64
+import hashlib
+import os
+import threading
 import time
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+from requests.adapters import HTTPAdapter
 
+from utils.chunking import chunk_lines, chunk_text
+from utils.quota import INTERACTIVE, QuotaExceeded, acquire_quota, get_quota_manager
 
-def search_github(query, github_token=None, max_results=5):
+# File types worth feeding to the vector store when ingesting repository code
+CODE_EXTENSIONS = {
+    ".py", ".c", ".h", ".cc", ".cpp", ".hpp", ".java", ".kt", ".scala", ".go", ".rs",
+    ".js", ".ts", ".jl", ".r", ".m", ".hs", ".ml", ".lean", ".v", ".agda", ".sage",
+}
+DOC_EXTENSIONS = {".md", ".rst", ".txt", ".tex"}
+SKIPPED_DIRECTORIES = {"node_modules", "vendor", "third_party", "dist", "build", ".github", "__pycache__"}
+# Repository boilerplate; the README is already embedded from the search results
+SKIPPED_FILE_STEMS = {
+    "readme", "changelog", "changes", "history", "news", "contributing", "contributors", "authors",
+    "code_of_conduct", "security", "license", "licence", "copying", "notice", "codeowners",
+    "setup", "conftest",
+}
+
+
+def search_github(query, github_token=None, max_results=5, priority=INTERACTIVE):
     """
     Search GitHub repositories and fetch details including README content.
     Uses public API without requiring authentication token.
     The github_token parameter is kept for backward compatibility but is no longer used.
+    Every API call first waits for the shared "github" quota at the given priority.
+    All calls share one wait budget of QUOTA_MAX_WAIT_SECONDS; once it is spent the
+    remaining READMEs are skipped.
     """
     headers = {
         "Accept": "application/vnd.github.v3+json"
@@ -22,11 +48,19 @@ def search_github(query, github_token=None, max_results=5):
         "per_page": max_results
     }
 
+    manager = get_quota_manager()
+    wait_until = time.monotonic() + (manager.max_wait if manager is not None else 0)
+
+    def take_token():
+        acquire_quota("github", priority, max_wait=wait_until - time.monotonic())
+
     try:
+        take_token()
         response = requests.get(search_url, headers=headers, params=params)
         response.raise_for_status()
         repos = response.json().get("items", [])
         results = []
+        fetch_readmes = True
 
         for repo in repos:
             repo_info = {
@@ -41,22 +75,27 @@ def search_github(query, github_token=None, max_results=5):
                 "readme": "No README found."
             }
 
-            # Try to fetch README from known branches
-            try:
-                time.sleep(1)  # Increased delay to respect rate limits for unauthenticated requests
+            # Try to fetch README from known branches, unless the quota budget is spent
+            if fetch_readmes:
+                try:
+                    if manager is None:
+                        time.sleep(1)  # Increased delay to respect rate limits for unauthenticated requests
 
-                for branch in ["main", "master"]:
-                    readme_url = f"https://api.github.com/repos/{repo['full_name']}/contents/README.md?ref={branch}"
-                    readme_response = requests.get(readme_url, headers=headers)
+                    for branch in ["main", "master"]:
+                        readme_url = f"https://api.github.com/repos/{repo['full_name']}/contents/README.md?ref={branch}"
+                        take_token()
+                        readme_response = requests.get(readme_url, headers=headers)
 
-                    if readme_response.status_code == 200:
-                        readme_data = readme_response.json()
-                        if readme_data.get("encoding") == "base64":
-                            readme_content = base64.b64decode(readme_data["content"]).decode("utf-8", errors="replace")
-                            repo_info["readme"] = readme_content
-                            break
-            except Exception:
-                pass  # Ignore README errors silently
+                        if readme_response.status_code == 200:
+                            readme_data = readme_response.json()
+                            if readme_data.get("encoding") == "base64":
+                                readme_content = base64.b64decode(readme_data["content"]).decode("utf-8", errors="replace")
+                                repo_info["readme"] = readme_content
+                                break
+                except QuotaExceeded:
+                    fetch_readmes = False  # Don't wait again for every remaining repository
+                except Exception:
+                    pass  # Ignore README errors silently
 
             results.append(repo_info)
 
@@ -79,6 +118,7 @@ def get_repo_contents(repo_name, path="", github_token=None):
     url = f"https://api.github.com/repos/{repo_name}/contents/{path}"
 
     try:
+        acquire_quota("github")
         response = requests.get(url, headers=headers)
         response.raise_for_status()
         return response.json()
@@ -87,6 +127,207 @@ def get_repo_contents(repo_name, path="", github_token=None):
         return []
 
 
+def list_repo_tree(repo_name, ref="HEAD", session=None, priority=INTERACTIVE):
+    """
+    List every file of a repository with a single recursive git-trees call.
+
+    GitHub truncates the listing of very large repositories; a warning is shown
+    and the partial listing is returned.
+
+    Returns:
+        list: Tree entries (dicts with path, sha and size) for files only
+    """
+    headers = {
+        "Accept": "application/vnd.github.v3+json"
+    }
+    url = f"https://api.github.com/repos/{repo_name}/git/trees/{ref}"
+
+    try:
+        acquire_quota("github", priority)
+        response = (session or requests).get(url, headers=headers, params={"recursive": 1}, timeout=30)
+        response.raise_for_status()
+        tree = response.json()
+        if tree.get("truncated"):
+            st.warning(f"The file listing of {repo_name} was truncated by GitHub; only part of it is ingested.")
+        return [entry for entry in tree.get("tree", []) if entry.get("type") == "blob"]
+    except Exception as e:
+        st.error(f"Error listing repository tree: {e}")
+        return []
+
+
+def select_repo_files(entries, max_file_size=100_000, max_files=40, include_docs=True):
+    """
+    Keep the source and documentation files worth ingesting.
+
+    Code files are ranked ahead of documentation and shallower paths ahead of
+    deeper ones within each group; READMEs, changelogs, licences, setup scripts, requirement
+    lists and similar boilerplate are skipped.
+
+    Args:
+        entries (list): Tree entries from ``list_repo_tree``
+        max_file_size (int): Largest file, in bytes, to fetch
+        max_files (int): Maximum number of files to keep
+        include_docs (bool): Also keep Markdown, reStructuredText, text and TeX files
+
+    Returns:
+        list: The selected tree entries
+    """
+    extensions = CODE_EXTENSIONS | DOC_EXTENSIONS if include_docs else CODE_EXTENSIONS
+    selected = []
+    for entry in entries:
+        path = entry["path"]
+        directories = path.split("/")[:-1]
+        if any(d in SKIPPED_DIRECTORIES for d in directories):
+            continue
+        stem, extension = os.path.splitext(os.path.basename(path).lower())
+        if extension not in extensions or path.endswith(".min.js"):
+            continue
+        if stem in SKIPPED_FILE_STEMS or stem.startswith("requirements"):
+            continue
+        if not 0 < entry.get("size", 0) <= max_file_size:
+            continue
+        selected.append(entry)
+
+    def rank(entry):
+        is_doc = os.path.splitext(entry["path"])[1].lower() not in CODE_EXTENSIONS
+        return is_doc, entry["path"].count("/"), entry["path"]
+
+    selected.sort(key=rank)
+    return selected[:max_files]
+
+
+def git_blob_sha(content):
+    """Compute the git blob SHA-1 of raw file content."""
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+class BlobCache:
+    """File contents on disk, addressed by git blob SHA, so unchanged files are never refetched."""
+
+    def __init__(self, cache_dir="data/github_blobs"):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, sha):
+        return os.path.join(self.cache_dir, sha[:2], sha)
+
+    def get(self, sha):
+        path = self._path(sha)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def put(self, sha, content):
+        path = self._path(sha)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+
+def pooled_session(pool_size=8):
+    """Create a requests session whose connection pool serves ``pool_size`` concurrent fetches."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_repo_files(repo_name, entries, ref="HEAD", cache=None, session=None, workers=8):
+    """
+    Fetch file contents concurrently, serving unchanged files from the SHA cache.
+
+    Contents come from raw.githubusercontent.com, which doesn't count against the
+    REST API rate limit, and are checked against the tree's blob SHA before caching.
+
+    Returns:
+        dict: Path -> file content (bytes) for every file fetched or cached
+    """
+    cache = cache or BlobCache()
+    contents = {}
+    missing = []
+    for entry in entries:
+        cached = cache.get(entry["sha"])
+        if cached is None:
+            missing.append(entry)
+        else:
+            contents[entry["path"]] = cached
+
+    def fetch(entry):
+        url = f"https://raw.githubusercontent.com/{repo_name}/{quote(ref)}/{quote(entry['path'])}"
+        response = (session or requests).get(url, timeout=30)
+        response.raise_for_status()
+        return entry, response.content
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(fetch, entry) for entry in missing]
+            for future in futures:
+                try:
+                    entry, content = future.result()
+                except Exception:
+                    continue  # Skip files that fail to download
+                if git_blob_sha(content) != entry["sha"]:
+                    continue  # The branch moved on since the tree was listed
+                cache.put(entry["sha"], content)
+                contents[entry["path"]] = content
+
+    return contents
+
+
+def repo_file_passages(repo, path, content):
+    """Split one repository file into vector-store documents."""
+    if b"\0" in content[:8000]:
+        return []  # Binary file
+    text = content.decode("utf-8", errors="replace")
+    is_doc = os.path.splitext(path)[1].lower() in DOC_EXTENSIONS
+    passages = chunk_text(text) if is_doc else chunk_lines(text)
+    return [{
+        "title": repo["title"],
+        "full_name": repo["full_name"],
+        "url": f"{repo['url']}/blob/HEAD/{path}",
+        "path": path,
+        "code": passage,
+    } for passage in passages]
+
+
+def ingest_repository(repo, vector_store, max_files=40, max_file_size=100_000, cache_dir="data/github_blobs",
+                      workers=8, priority=INTERACTIVE):
+    """
+    Add the code and documentation passages of one repository to a vector store.
+
+    Costs one REST API call (the recursive tree listing); file contents are
+    fetched concurrently through a pooled session and cached by blob SHA.
+
+    Args:
+        repo (dict): Repository info from ``search_github``
+        vector_store (VectorStore): Store that receives the passages
+        max_files (int): Maximum number of files ingested
+        max_file_size (int): Largest file, in bytes, to fetch
+        cache_dir (str): Directory of the blob cache
+        workers (int): Concurrent file fetches
+        priority (str): Quota priority of the tree listing
+
+    Returns:
+        int: The number of passages added
+    """
+    with pooled_session(workers) as session:
+        entries = list_repo_tree(repo["full_name"], session=session, priority=priority)
+        selected = select_repo_files(entries, max_file_size=max_file_size, max_files=max_files)
+        contents = fetch_repo_files(repo["full_name"], selected, cache=BlobCache(cache_dir),
+                                    session=session, workers=workers)
+
+    docs = []
+    for entry in selected:
+        if entry["path"] in contents:
+            docs.extend(repo_file_passages(repo, entry["path"], contents[entry["path"]]))
+    if docs:
+        vector_store.add_documents(docs)
+    return len(docs)
+
+
 # Example Streamlit UI implementation
 def github_search_app():
     st.title("GitHub Repository Search")
@@ -0,0 +1,220 @@
+"""
+Deadline-bound, retrying and optionally hedged LLM generation.
+
+``GenerationClient`` wraps one or two models exposing ``generate_content_async``
+(``google.generativeai.GenerativeModel`` or the ``FakeModel`` below):
+
+- every request has an overall deadline;
+- rate-limit errors are retried with full-jitter exponential backoff;
+- when a second model is configured, a request that has not finished within
+  the primary model's observed latency percentile is hedged to it, and the
+  slower of the two calls is cancelled;
+- failures raise ``GenerationError`` instead of coming back as text.
+
+The coroutines run on one long-lived event loop in a background thread, so
+async gRPC channels created by the model clients stay bound to a single loop.
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+
+
+class GenerationError(Exception):
+    """Raised when a proof could not be generated."""
+
+
+def is_rate_limit_error(error):
+    """Recognise rate-limit errors without importing the provider's exception types."""
+    if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+        return True
+    if type(error).__name__ in ("ResourceExhausted", "TooManyRequests", "RateLimitError"):
+        return True
+    return "429" in str(error) or "quota" in str(error).lower()
+
+
+class LatencyTracker:
+    """Rolling window of primary call latencies (elapsed time for cancelled calls)."""
+
+    def __init__(self, window=200, min_samples=20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, p):
+        """Return the p-th percentile latency, or None until enough samples exist."""
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class FakeModel:
+    """
+    Local stand-in for a generative model with injectable latency and failures.
+
+    Args:
+        text (str): Text returned by successful calls
+        latency (float or callable): Seconds each call takes, or a function returning them
+        errors (list): Exceptions raised by the first calls, in order
+    """
+
+    def __init__(self, text="Fake proof.", latency=0.0, errors=None):
+        self.text = text
+        self.latency = latency
+        self.errors = list(errors or [])
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.calls += 1
+        latency = self.latency() if callable(self.latency) else self.latency
+        try:
+            await asyncio.sleep(latency)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.errors:
+            raise self.errors.pop(0)
+        return SimpleNamespace(text=self.text)
+
+
+class GenerationClient:
+    """
+    Generate text with deadlines, rate-limit retries and optional hedging.
+
+    Args:
+        model: Primary model exposing ``generate_content_async``
+        hedge_model: Optional second model used for hedged requests
+        deadline (float): Seconds allowed for a request, including retries
+        max_retries (int): Retries after rate-limit errors
+        backoff_base (float): Base of the exponential backoff in seconds
+        backoff_max (float): Upper bound of a single backoff in seconds
+        hedge_percentile (float): Primary latency percentile after which to hedge
+        min_samples (int): Latencies observed before hedging starts
+        rng (random.Random): Source of backoff jitter
+        acquire_quota (callable): Blocking call made before every model request with
+            the seconds it may wait, e.g. for a shared rate-limit token; it should
+            raise once that time has passed. Hedges pass 0 and are skipped when it raises
+    """
+
+    def __init__(self, model, hedge_model=None, deadline=60.0, max_retries=3, backoff_base=1.0,
+                 backoff_max=16.0, hedge_percentile=95, min_samples=20, rng=None, acquire_quota=None):
+        self.model = model
+        self.hedge_model = hedge_model
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_percentile = hedge_percentile
+        self.latencies = LatencyTracker(min_samples=min_samples)
+        self.rng = rng or random.Random()
+        self.acquire_quota = acquire_quota
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True, name="generation-loop")
+        self._thread.start()
+
+    def generate(self, prompt):
+        """
+        Generate text for a prompt.
+
+        Returns:
+            str: The generated text
+
+        Raises:
+            GenerationError: If the deadline passes or the models fail
+        """
+        future = asyncio.run_coroutine_threadsafe(self._generate(prompt), self._loop)
+        return future.result()
+
+    def hedge_after(self):
+        """Seconds after which a request is hedged, or None when hedging is off."""
+        if self.hedge_model is None or self.hedge_percentile is None:
+            return None
+        return self.latencies.percentile(self.hedge_percentile)
+
+    async def _generate(self, prompt):
+        deadline_at = time.monotonic() + self.deadline
+        try:
+            return await asyncio.wait_for(self._generate_with_retries(prompt, deadline_at), timeout=self.deadline)
+        except asyncio.TimeoutError:
+            raise GenerationError(f"No response within the {self.deadline:g}s deadline.") from None
+
+    async def _generate_with_retries(self, prompt, deadline_at):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self._hedged_call(prompt, deadline_at)
+            except GenerationError:
+                raise
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.max_retries:
+                    raise GenerationError(f"Generation failed: {e}") from e
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                await asyncio.sleep(self.rng.uniform(0, delay))
+
+    async def _acquire(self, max_wait):
+        if self.acquire_quota is not None:
+            # Waiting for quota blocks, so keep it off the event loop. The executor
+            # thread outlives a cancelled coroutine, so its wait must be bounded
+            await asyncio.get_running_loop().run_in_executor(None, self.acquire_quota, max(0.0, max_wait))
+
+    async def _call(self, model, prompt, track_latency):
+        start = time.monotonic()
+        try:
+            response = await model.generate_content_async(prompt)
+        except asyncio.CancelledError:
+            # A primary that lost to the hedge was at least this slow; leaving it out
+            # would bias the window towards fast calls and make hedging ever more eager
+            if track_latency:
+                self.latencies.record(time.monotonic() - start)
+            raise
+        text = response.text
+        if not text or not text.strip():
+            raise GenerationError("The model returned an empty response.")
+        if track_latency:
+            self.latencies.record(time.monotonic() - start)
+        return text
+
+    async def _hedged_call(self, prompt, deadline_at):
+        # The primary's quota wait happens before the hedge clock starts, so queueing
+        # for quota doesn't look like a slow model call and trigger hedges
+        await self._acquire(deadline_at - time.monotonic())
+        primary = asyncio.ensure_future(self._call(self.model, prompt, track_latency=True))
+        tasks = [primary]
+        try:
+            hedge_after = self.hedge_after()
+            if hedge_after is None:
+                return await primary
+
+            done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+            if done:
+                return primary.result()
+
+            try:
+                await self._acquire(0)  # A hedge only runs if a token is free right now
+            except Exception:
+                return await primary
+            tasks.append(asyncio.ensure_future(self._call(self.hedge_model, prompt, track_latency=False)))
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            # Cancel whichever call is slower, including on deadline expiry
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
@@ -0,0 +1,158 @@
+"""
+Speculative source prefetching.
+
+Between entering a topic and clicking Generate, the slow part of proof
+generation (scraping GitHub and arXiv and embedding the results) can already
+run in the background. Once a user's topic has been stable for the debounce
+interval a prefetch starts for it; the Generate click adopts the in-flight
+result, and prefetches for superseded text are cancelled.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PrefetchCancelled(Exception):
+    """Raised inside a prefetch when its topic has been superseded."""
+
+
+def normalize_topic(topic):
+    """Key prefetches so that whitespace and case edits don't start new ones."""
+    return " ".join(topic.lower().split())
+
+
+class _Prefetch:
+    def __init__(self, user, topic):
+        self.user = user
+        self.topic = topic
+        self.key = normalize_topic(topic)
+        self.created = time.monotonic()
+        self.cancelled = threading.Event()
+        self.timer = None
+        self.future = None
+
+    def checkpoint(self):
+        """Stop the prefetch between steps once it has been cancelled."""
+        if self.cancelled.is_set():
+            raise PrefetchCancelled(self.topic)
+
+    def cancel(self):
+        self.cancelled.set()
+        if self.timer is not None:
+            self.timer.cancel()
+        if self.future is not None:
+            self.future.cancel()
+
+
+class PrefetchManager:
+    """
+    Debounced, cancellable, per-user-capped background prefetches.
+
+    Args:
+        fetch_fn (callable): Called as ``fetch_fn(topic, checkpoint=...)``; it should call
+            ``checkpoint()`` between slow steps so cancelled prefetches stop early
+        debounce_seconds (float): How long a topic must stay unchanged before prefetching
+        max_per_user (int): Maximum pending or running prefetches per user
+        max_workers (int): Size of the shared worker pool
+        ttl_seconds (float): How long an unadopted result is kept
+    """
+
+    def __init__(self, fetch_fn, debounce_seconds=1.5, max_per_user=2, max_workers=4, ttl_seconds=300):
+        self.fetch_fn = fetch_fn
+        self.debounce_seconds = debounce_seconds
+        self.max_per_user = max_per_user
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._lock = threading.RLock()  # Future callbacks may run while it is held
+        self._latest = {}   # user -> the prefetch for their current topic
+        self._active = {}   # user -> prefetches that are pending or still running
+
+    def schedule(self, user, topic):
+        """Note the user's current topic and prefetch it once it has stayed unchanged."""
+        if not topic or not topic.strip():
+            return
+
+        with self._lock:
+            self._expire()
+            key = normalize_topic(topic)
+            latest = self._latest.get(user)
+            if latest is not None:
+                if latest.key == key and not latest.cancelled.is_set():
+                    return
+                self._cancel(latest)
+
+            entry = _Prefetch(user, topic)
+            self._latest[user] = entry
+            if len(self._active.get(user, ())) < self.max_per_user:
+                self._arm(entry)
+            # Otherwise superseded prefetches are still winding down; the newest
+            # topic waits in _latest and is armed by _finish once a slot frees up
+
+    def adopt(self, user, topic, timeout=None):
+        """
+        Take over the prefetch for ``topic`` if there is one.
+
+        A prefetch that fails or is not finished within ``timeout`` is cancelled
+        so the caller can fetch directly instead.
+
+        Returns:
+            The prefetched result, or None when nothing usable was prefetched
+        """
+        with self._lock:
+            entry = self._latest.get(user)
+            if entry is None or entry.key != normalize_topic(topic) or entry.cancelled.is_set():
+                return None
+            del self._latest[user]
+            if entry.future is None:
+                # Still debouncing; the caller fetches directly instead
+                self._cancel(entry)
+                return None
+            future = entry.future
+
+        try:
+            return future.result(timeout=timeout)
+        except Exception:
+            with self._lock:
+                self._cancel(entry)
+            return None
+
+    def cancel_user(self, user):
+        """Cancel everything prefetched for a user, e.g. when they leave the page."""
+        with self._lock:
+            entry = self._latest.pop(user, None)
+            if entry is not None:
+                self._cancel(entry)
+
+    def _arm(self, entry):
+        entry.timer = threading.Timer(self.debounce_seconds, self._start, args=(entry,))
+        entry.timer.daemon = True
+        self._active.setdefault(entry.user, set()).add(entry)
+        entry.timer.start()
+
+    def _start(self, entry):
+        with self._lock:
+            if entry.cancelled.is_set():
+                return
+            entry.future = self._executor.submit(self.fetch_fn, entry.topic, checkpoint=entry.checkpoint)
+            entry.future.add_done_callback(lambda _: self._finish(entry))
+
+    def _finish(self, entry):
+        with self._lock:
+            active = self._active.get(entry.user, set())
+            active.discard(entry)
+            waiting = self._latest.get(entry.user)
+            if (waiting is not None and waiting.timer is None and not waiting.cancelled.is_set()
+                    and len(active) < self.max_per_user):
+                self._arm(waiting)
+
+    def _cancel(self, entry):
+        entry.cancel()
+        if entry.future is None or entry.future.done():
+            self._active.get(entry.user, set()).discard(entry)
+
+    def _expire(self):
+        now = time.monotonic()
+        for user, entry in list(self._latest.items()):
+            if now - entry.created > self.ttl_seconds:
+                del self._latest[user]
+                self._cancel(entry)
@@ -0,0 +1,197 @@
+"""
+On-demand per-request sampling profiler.
+
+Wraps a single request in a low-overhead sampler that periodically records
+the call stack of the profiled thread, and optionally in a ``tracemalloc``
+session.
+When the request finishes it writes, under the profiles directory:
+
+    <name>.collapsed        collapsed stacks for flamegraph.pl / inferno
+    <name>.speedscope.json  the same samples for https://www.speedscope.app
+    <name>.tracemalloc      a tracemalloc snapshot (load with tracemalloc.Snapshot.load)
+    <name>.memory.txt       the top allocation sites from that snapshot
+
+The memory files are only written when allocation tracing is enabled.
+Unlike stack sampling, tracemalloc is process-wide: while any profiled
+request traces memory, every thread in the process is slowed and its
+allocations appear in the snapshot.
+"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9._-]+")
+
+# Overlapping profiled requests share one tracemalloc session; the last to finish stops it
+_tracing_lock = threading.Lock()
+_tracing_sessions = 0
+_owns_tracing = False
+
+
+def _start_tracing(frames):
+    global _tracing_sessions, _owns_tracing
+    with _tracing_lock:
+        if _tracing_sessions == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            _owns_tracing = True
+        _tracing_sessions += 1
+
+
+def _stop_tracing():
+    global _tracing_sessions, _owns_tracing
+    with _tracing_lock:
+        _tracing_sessions -= 1
+        if _tracing_sessions == 0 and _owns_tracing:
+            tracemalloc.stop()
+            _owns_tracing = False
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples one thread's stack every ``interval`` seconds from a background thread.
+
+    Only the profiled thread is sampled, so concurrent sessions served by the
+    same process don't appear in the profile.
+    """
+
+    def __init__(self, thread_id=None, interval=0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self.started = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._run, daemon=True, name="sampling-profiler")
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+        self.duration = time.perf_counter() - self.started
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def write_collapsed(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{';'.join(frame.replace(';', ',') for frame in stack)} {count}\n")
+
+    def write_speedscope(self, path, name):
+        frames, frame_index = [], {}
+        samples, weights = [], []
+        for stack, count in self.stacks.items():
+            indices = []
+            for label in stack:
+                if label not in frame_index:
+                    frame_index[label] = len(frames)
+                    frames.append({"name": label})
+                indices.append(frame_index[label])
+            samples.append(indices)
+            weights.append(count * self.interval)
+
+        document = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+            "name": name,
+            "exporter": "turboproof",
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(document, f)
+
+
+class ProfileResult:
+    """Where a finished profile was written."""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.duration = None
+        self.samples = 0
+        self.memory_skipped = False  # Memory was requested but tracing had been stopped elsewhere
+
+
+@contextmanager
+def profile_request(name, profiles_dir="profiles", interval=0.005, memory=False, memory_frames=1,
+                    top_allocations=25):
+    """
+    Profile the enclosed block and write a flamegraph and, optionally, a memory snapshot.
+
+    Stack sampling costs only a few percent and sees only the calling thread.
+    tracemalloc hooks every allocation in the process and can slow
+    allocation-heavy code several times over, so it is off unless ``memory``
+    is set.
+
+    Args:
+        name (str): Label for the output files; a timestamp is appended
+        profiles_dir (str): Directory the profile files are written to
+        interval (float): Seconds between stack samples
+        memory (bool): Also record a tracemalloc allocation snapshot
+        memory_frames (int): Stack depth recorded per allocation by tracemalloc
+        top_allocations (int): Allocation sites listed in the memory summary
+
+    Yields:
+        ProfileResult: Filled in with the output prefix, duration and sample count on exit
+    """
+    os.makedirs(profiles_dir, exist_ok=True)
+    now = time.time()
+    # Milliseconds and the thread id keep profiles written in the same second apart
+    timestamp = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{int(now * 1000) % 1000:03d}"
+    stem = f"{_UNSAFE_CHARS.sub('_', name)}-{timestamp}-{threading.get_ident()}"
+    result = ProfileResult(os.path.join(profiles_dir, stem))
+
+    if memory:
+        _start_tracing(memory_frames)
+    profiler = SamplingProfiler(interval=interval)
+    profiler.start()
+    try:
+        yield result
+    finally:
+        profiler.stop()
+        snapshot = None
+        if memory:
+            if tracemalloc.is_tracing():
+                snapshot = tracemalloc.take_snapshot()
+            else:
+                result.memory_skipped = True
+            _stop_tracing()
+
+        profiler.write_collapsed(f"{result.prefix}.collapsed")
+        profiler.write_speedscope(f"{result.prefix}.speedscope.json", name)
+        if snapshot is not None:
+            snapshot.dump(f"{result.prefix}.tracemalloc")
+            with open(f"{result.prefix}.memory.txt", "w", encoding="utf-8") as f:
+                for stat in snapshot.statistics("lineno")[:top_allocations]:
+                    f.write(f"{stat}\n")
+
+        result.duration = profiler.duration
+        result.samples = sum(profiler.stacks.values())
@@ -0,0 +1,220 @@
+"""
+Streaming bulk export and import of saved proofs.
+
+Exports read the ``projects`` collection through a batched cursor and write
+one JSON document per line, either plain or inside a zip archive, so memory
+use stays constant however long a user's history is. Imports use unordered
+``insert_many`` batches and skip documents that already exist, identified by
+(username, topic, created_at).
+
+Usage:
+    python -m utils.proof_export export --user alice --out alice.jsonl.zip
+    python -m utils.proof_export import alice.jsonl.zip [--as-user bob]
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import zipfile
+from datetime import datetime, timezone
+
+from bson import json_util
+from bson.json_util import JSONOptions, JSONMode
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError
+
+_JSON_OPTIONS = JSONOptions(json_mode=JSONMode.RELAXED, tz_aware=True, tzinfo=timezone.utc)
+_DUPLICATE_KEY = 11000
+ZIP_MEMBER = "proofs.jsonl"
+
+
+def ensure_project_indexes(collection):
+    """
+    Create the unique key used to deduplicate imports.
+
+    Older proofs were saved without ``created_at``; they get the timestamp of
+    their ObjectId first, as exports do, so the key also covers them and
+    restoring an export into the same database doesn't duplicate them.
+    """
+    collection.update_many(
+        {"created_at": {"$exists": False}},
+        [{"$set": {"created_at": {"$toDate": "$_id"}}}],
+    )
+    collection.create_index(
+        [("username", ASCENDING), ("topic", ASCENDING), ("created_at", ASCENDING)],
+        unique=True,
+        partialFilterExpression={"created_at": {"$exists": True}},
+        name="username_topic_created_at",
+    )
+
+
+def _with_created_at(doc):
+    # Older proofs were saved without a timestamp; their ObjectId carries one
+    if "created_at" not in doc and "_id" in doc and hasattr(doc["_id"], "generation_time"):
+        doc["created_at"] = doc["_id"].generation_time
+    return doc
+
+
+def iter_export_lines(collection, username, batch_size=500):
+    """Yield one encoded JSON line per saved proof of ``username``, oldest first."""
+    cursor = collection.find({"username": username}).sort("_id", ASCENDING).batch_size(batch_size)
+    try:
+        for doc in cursor:
+            doc = _with_created_at(doc)
+            doc.pop("_id", None)
+            yield (json_util.dumps(doc, json_options=_JSON_OPTIONS) + "\n").encode("utf-8")
+    finally:
+        cursor.close()
+
+
+def write_export(collection, username, fileobj, fmt="jsonl", batch_size=500):
+    """
+    Stream a user's proofs into a binary file object.
+
+    Args:
+        collection: The projects collection
+        username (str): Whose proofs to export
+        fileobj: Writable binary file object
+        fmt (str): "jsonl" or "zip"
+        batch_size (int): Cursor batch size
+
+    Returns:
+        int: The number of proofs exported
+    """
+    count = 0
+    lines = iter_export_lines(collection, username, batch_size=batch_size)
+    if fmt == "zip":
+        with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            with archive.open(ZIP_MEMBER, "w", force_zip64=True) as member:
+                for line in lines:
+                    member.write(line)
+                    count += 1
+    else:
+        for line in lines:
+            fileobj.write(line)
+            count += 1
+    return count
+
+
+def export_to_tempfile(collection, username, fmt="zip", batch_size=500):
+    """
+    Stream an export to a temporary file on disk and return it opened for binary reading.
+
+    The file is unlinked once opened, so it disappears when the caller closes it.
+    Writing the export takes constant memory, but Streamlit's download button
+    reads the whole file into memory to serve it; very large histories are
+    better exported with the command line.
+    """
+    with tempfile.NamedTemporaryFile(suffix=f".{fmt}", delete=False) as f:
+        try:
+            write_export(collection, username, f, fmt=fmt, batch_size=batch_size)
+        except BaseException:
+            os.unlink(f.name)
+            raise
+    export_file = open(f.name, "rb")
+    os.unlink(f.name)
+    return export_file
+
+
+def _iter_import_lines(fileobj):
+    head = fileobj.read(4)
+    fileobj.seek(0)
+    if head.startswith(b"PK"):
+        with zipfile.ZipFile(fileobj) as archive:
+            with archive.open(ZIP_MEMBER) as member:
+                yield from io.TextIOWrapper(member, encoding="utf-8")
+    else:
+        yield from io.TextIOWrapper(fileobj, encoding="utf-8")
+
+
+def _insert_batch(collection, batch):
+    try:
+        return len(collection.insert_many(batch, ordered=False).inserted_ids), 0
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(error["code"] != _DUPLICATE_KEY for error in errors):
+            raise
+        return e.details.get("nInserted", 0), len(errors)
+
+
+def import_projects(collection, fileobj, username=None, batch_size=500):
+    """
+    Bulk-import proofs from a JSONL or zipped JSONL export.
+
+    Args:
+        collection: The projects collection
+        fileobj: Readable, seekable binary file object
+        username (str): Reassign every proof to this user (optional)
+        batch_size (int): Documents per ``insert_many``
+
+    Returns:
+        dict: Counts of inserted and duplicate (skipped) proofs
+    """
+    ensure_project_indexes(collection)
+    inserted = duplicates = 0
+    batch = []
+
+    for line in _iter_import_lines(fileobj):
+        if not line.strip():
+            continue
+        doc = json_util.loads(line, json_options=_JSON_OPTIONS)
+        doc = _with_created_at(doc)
+        doc.pop("_id", None)
+        doc.setdefault("created_at", datetime.now(timezone.utc))
+        if username:
+            doc["username"] = username
+        batch.append(doc)
+
+        if len(batch) >= batch_size:
+            added, skipped = _insert_batch(collection, batch)
+            inserted, duplicates = inserted + added, duplicates + skipped
+            batch = []
+
+    if batch:
+        added, skipped = _insert_batch(collection, batch)
+        inserted, duplicates = inserted + added, duplicates + skipped
+
+    return {"inserted": inserted, "duplicates": duplicates}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import saved proofs.")
+    parser.add_argument("--mongo-uri", help="MongoDB URI (default: MONGO_URI from the Streamlit secrets)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export = subparsers.add_parser("export", help="Stream a user's proofs to JSONL or zip")
+    export.add_argument("--user", required=True, help="Username whose proofs to export")
+    export.add_argument("--out", default="-", help="Output path; '-' for stdout; a .zip suffix zips the export")
+    export.add_argument("--batch-size", type=int, default=500)
+
+    restore = subparsers.add_parser("import", help="Bulk-import an export, skipping existing proofs")
+    restore.add_argument("path", help="JSONL or zip export")
+    restore.add_argument("--as-user", help="Reassign the imported proofs to this user")
+    restore.add_argument("--batch-size", type=int, default=500)
+
+    args = parser.parse_args()
+
+    if args.mongo_uri:
+        from pymongo import MongoClient
+
+        collection = MongoClient(args.mongo_uri)["turbo_proof"]["projects"]
+    else:
+        from db import projects_collection as collection
+
+    if args.command == "export":
+        fmt = "zip" if args.out.endswith(".zip") else "jsonl"
+        if args.out == "-":
+            count = write_export(collection, args.user, sys.stdout.buffer, fmt=fmt, batch_size=args.batch_size)
+        else:
+            with open(args.out, "wb") as f:
+                count = write_export(collection, args.user, f, fmt=fmt, batch_size=args.batch_size)
+        print(f"Exported {count} proofs", file=sys.stderr)
+    else:
+        with open(args.path, "rb") as f:
+            result = import_projects(collection, f, username=args.as_user, batch_size=args.batch_size)
+        print(f"Imported {result['inserted']} proofs, skipped {result['duplicates']} duplicates", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Shared API quota management.
+
+Every worker process and replica checks a shared token bucket before calling
+GitHub or Gemini, so concurrent sessions stay inside the providers' limits
+together instead of failing together. Buckets live in MongoDB (updated
+atomically with ``findAndModify``, for multi-replica deployments) or in a
+file guarded by an exclusive lock (for single-host deployments).
+
+Callers that find a bucket empty wait for it to refill rather than fail.
+Batch work (prefetches, ingestion jobs) may not dip into a reserve kept for
+interactive requests, so interactive users are served first.
+"""
+import fcntl
+import json
+import os
+import random
+import time
+
+import streamlit as st
+from pymongo import ReturnDocument
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+
+class QuotaExceeded(Exception):
+    """Raised when a quota token could not be obtained within the allowed wait."""
+
+
+class MongoQuotaStore:
+    """Token buckets in a MongoDB collection, one document per bucket."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def try_acquire(self, bucket, capacity, refill_per_second, reserve):
+        """
+        Refill the bucket and take one token if more than ``reserve`` remain.
+
+        The whole read-refill-take sequence is a single atomic pipeline update
+        evaluated with the server's clock, so replicas with skewed clocks agree.
+
+        Returns:
+            tuple: (granted, seconds until a token is expected to be available)
+        """
+        elapsed_seconds = {"$divide": [{"$subtract": ["$$NOW", {"$ifNull": ["$updated", "$$NOW"]}]}, 1000]}
+        refilled = {"$add": [{"$ifNull": ["$tokens", capacity]}, {"$multiply": [elapsed_seconds, refill_per_second]}]}
+        doc = self.collection.find_one_and_update(
+            {"_id": bucket},
+            [
+                {"$set": {"tokens": {"$min": [capacity, refilled]}, "updated": "$$NOW"}},
+                {"$set": {"granted": {"$gte": ["$tokens", 1 + reserve]}}},
+                {"$set": {"tokens": {"$cond": ["$granted", {"$subtract": ["$tokens", 1]}, "$tokens"]}}},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc["granted"]:
+            return True, 0.0
+        return False, (1 + reserve - doc["tokens"]) / refill_per_second
+
+
+class FileQuotaStore:
+    """Token buckets in a JSON file shared by the processes of one host."""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def try_acquire(self, bucket, capacity, refill_per_second, reserve):
+        """Same contract as ``MongoQuotaStore.try_acquire``."""
+        with os.fdopen(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644), "r+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                content = f.read()
+                state = json.loads(content) if content.strip() else {}
+
+                now = time.time()
+                entry = state.get(bucket, {"tokens": capacity, "updated": now})
+                tokens = min(capacity, entry["tokens"] + max(0.0, now - entry["updated"]) * refill_per_second)
+                granted = tokens >= 1 + reserve
+                if granted:
+                    tokens -= 1
+                state[bucket] = {"tokens": tokens, "updated": now}
+
+                f.seek(0)
+                f.truncate()
+                json.dump(state, f)
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+        if granted:
+            return True, 0.0
+        return False, (1 + reserve - tokens) / refill_per_second
+
+
+class QuotaManager:
+    """
+    Queue callers on shared token buckets.
+
+    Args:
+        store: ``MongoQuotaStore`` or ``FileQuotaStore``
+        limits (dict): Bucket name -> (requests, per seconds), e.g. {"github": (60, 3600)}
+        batch_reserve (float): Fraction of each bucket that batch work may not use
+        max_wait (float): Seconds a caller waits for a token before QuotaExceeded
+    """
+
+    def __init__(self, store, limits, batch_reserve=0.2, max_wait=120.0):
+        self.store = store
+        self.limits = limits
+        self.batch_reserve = batch_reserve
+        self.max_wait = max_wait
+
+    def acquire(self, bucket, priority=INTERACTIVE, max_wait=None):
+        """
+        Block until a token is available in ``bucket``; unknown buckets are unlimited.
+
+        ``max_wait`` caps the wait below the configured one, e.g. to a request's
+        remaining deadline, so a caller that has given up never takes a token.
+        """
+        if bucket not in self.limits:
+            return
+
+        capacity, period = self.limits[bucket]
+        refill_per_second = capacity / period
+        reserve = capacity * self.batch_reserve if priority == BATCH else 0.0
+        max_wait = self.max_wait if max_wait is None else min(self.max_wait, max(0.0, max_wait))
+        deadline = time.monotonic() + max_wait
+
+        while True:
+            granted, wait = self.store.try_acquire(bucket, capacity, refill_per_second, reserve)
+            if granted:
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise QuotaExceeded(f"No {bucket} quota available within {max_wait:g}s.")
+            # Jitter spreads out the waiters so they don't all retry at once
+            time.sleep(min(remaining, wait * random.uniform(1.0, 1.2)))
+
+
+@st.cache_resource
+def get_quota_manager():
+    """Build the quota manager configured in the secrets, or None when quotas are off."""
+    backend = str(st.secrets.get("QUOTA_BACKEND", "none")).lower()
+    if backend == "mongo":
+        from db import quotas_collection
+
+        store = MongoQuotaStore(quotas_collection)
+    elif backend == "file":
+        store = FileQuotaStore(st.secrets.get("QUOTA_FILE", "data/quotas.json"))
+    else:
+        return None
+
+    limits = {
+        "github": (float(st.secrets.get("QUOTA_GITHUB_PER_HOUR", 60)), 3600),
+        "gemini": (float(st.secrets.get("QUOTA_GEMINI_PER_MINUTE", 15)), 60),
+    }
+    return QuotaManager(
+        store,
+        limits,
+        batch_reserve=float(st.secrets.get("QUOTA_BATCH_RESERVE", 0.2)),
+        max_wait=float(st.secrets.get("QUOTA_MAX_WAIT_SECONDS", 120)),
+    )
+
+
+def acquire_quota(bucket, priority=INTERACTIVE, max_wait=None):
+    """Wait for a token in ``bucket`` if a quota manager is configured."""
+    manager = get_quota_manager()
+    if manager is not None:
+        manager.acquire(bucket, priority=priority, max_wait=max_wait)
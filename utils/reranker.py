@@ -0,0 +1,103 @@
+"""
+Cross-encoder reranking and maximal-marginal-relevance diversification.
+
+The bi-encoder index cheaply fetches a larger candidate set; a small CPU
+cross-encoder then scores each (query, passage) pair jointly, which is much
+more precise but too slow to run over the whole corpus.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+class Reranker:
+    """
+    Batched cross-encoder scoring with an LRU cache of (query, passage) scores.
+
+    Args:
+        model_name (str): Cross-encoder model name
+        batch_size (int): Pairs scored per forward pass
+        cache_size (int): Maximum cached scores
+        max_chars (int): Passages are truncated to this length before scoring
+    """
+
+    def __init__(self, model_name=DEFAULT_RERANKER_MODEL, batch_size=32, cache_size=4096, max_chars=2000):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.max_chars = max_chars
+        self.model = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self.model is None:
+            from sentence_transformers import CrossEncoder
+
+            self.model = CrossEncoder(self.model_name, device="cpu")
+        return self.model
+
+    @staticmethod
+    def _key(query, passage):
+        return hashlib.sha1(f"{query}\x00{passage}".encode("utf-8")).digest()
+
+    def score(self, query, passages):
+        """Return one relevance score per passage; higher is more relevant."""
+        passages = [passage[:self.max_chars] for passage in passages]
+        keys = [self._key(query, passage) for passage in passages]
+        scores = [None] * len(passages)
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    scores[i] = self._cache[key]
+
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            pairs = [(query, passages[i]) for i in missing]
+            predicted = self._load().predict(pairs, batch_size=self.batch_size)
+            with self._lock:
+                for i, score in zip(missing, predicted):
+                    scores[i] = float(score)
+                    self._cache[keys[i]] = scores[i]
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return np.asarray(scores, dtype="float32")
+
+
+def maximal_marginal_relevance(relevance, vectors, k, diversity_lambda=0.7):
+    """
+    Select ``k`` items balancing relevance against similarity to those already chosen.
+
+    Args:
+        relevance (numpy.ndarray): One relevance score per candidate
+        vectors (numpy.ndarray): Candidate embeddings, one row per candidate
+        k (int): Number of items to select
+        diversity_lambda (float): 1.0 ranks by relevance only, 0.0 by diversity only
+
+    Returns:
+        list: Indices of the selected candidates, in selection order
+    """
+    if len(relevance) == 0:
+        return []
+
+    # Bring relevance to [0, 1] so it is comparable with cosine similarity
+    spread = relevance.max() - relevance.min()
+    relevance = (relevance - relevance.min()) / spread if spread > 0 else np.ones_like(relevance)
+
+    normalized = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    similarity = normalized @ normalized.T
+
+    selected = [int(np.argmax(relevance))]
+    while len(selected) < min(k, len(relevance)):
+        redundancy = similarity[:, selected].max(axis=1)
+        mmr = diversity_lambda * relevance - (1 - diversity_lambda) * redundancy
+        mmr[selected] = -np.inf
+        selected.append(int(np.argmax(mmr)))
+    return selected
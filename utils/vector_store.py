@@ -1,29 +1,101 @@
-from sentence_transformers import SentenceTransformer
-import faiss
 import numpy as np
 
+from utils.dedup import document_text
+from utils.embedding_backends import build_index, index_requires_training, load_embedding_model
+from utils.embedding_server import DEFAULT_MODEL_NAME, encode_remote
+from utils.reranker import maximal_marginal_relevance
+
+
 class VectorStore:
-    def __init__(self):
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, socket_path=None, backend="torch", index_type="flat"):
+        self.model_name = model_name
+        self.socket_path = socket_path
+        self.backend = backend
+        self.index_type = index_type
+        self.model = None
+        self.use_server = True
         self.texts = []
-        self.embeddings = []
         self.index = None
+        self._pending = []
+
+    def encode(self, texts):
+        """Encode texts with the shared embedding server, or in-process if it is unavailable."""
+        if self.use_server:
+            embeddings = encode_remote(texts, self.socket_path, model_name=self.model_name, backend=self.backend)
+            if embeddings is not None:
+                return embeddings
+            self.use_server = False  # Don't retry a missing server for every call
 
-    def add_documents(self, docs):
-        for doc in docs:
-            content = doc.get("readme") or doc.get("summary") or doc.get("description", "")
+        if self.model is None:
+            self.model = load_embedding_model(self.model_name, backend=self.backend)
+        return np.asarray(self.model.encode(texts), dtype="float32")
+
+    def add_documents(self, docs, embeddings=None):
+        """Add documents, optionally with embeddings computed earlier (one row per document)."""
+        contents = []
+        vectors = []
+        for i, doc in enumerate(docs):
+            content = document_text(doc)
             if content:
                 self.texts.append(doc)
-                self.embeddings.append(self.model.encode(content))
+                contents.append(content)
+                if embeddings is not None:
+                    vectors.append(embeddings[i])
+
+        if contents:
+            self._index_vectors(np.asarray(vectors, dtype="float32") if vectors else self.encode(contents))
+
+    def _index_vectors(self, embeddings):
+        # Trained indexes learn their encoding once: the fp32 vectors are held
+        # until the first search, and later batches are added to the trained index.
+        if self.index is None and index_requires_training(self.index_type):
+            self._pending.append(np.asarray(embeddings, dtype="float32"))
+        elif self.index is None:
+            self.index = build_index(embeddings, self.index_type)
+        else:
+            self.index.add(np.ascontiguousarray(embeddings, dtype="float32"))
 
-        if self.embeddings:
-            self.index = faiss.IndexFlatL2(len(self.embeddings[0]))
-            self.index.add(np.array(self.embeddings))
+    def _build_pending_index(self):
+        if self._pending:
+            self.index = build_index(np.vstack(self._pending), self.index_type)
+            self._pending = []
 
-    def search(self, query, k=3):
-        if not self.index:
+    def search(self, query, k=3, reranker=None, candidates=20, mmr_lambda=None):
+        """
+        Return up to ``k`` documents for a query.
+
+        Args:
+            query (str): The search query
+            k (int): Number of documents to return; more than the corpus is fine
+            reranker (Reranker): Optional cross-encoder that reranks a larger candidate set
+            candidates (int): Candidates fetched from the index when reranking or diversifying
+            mmr_lambda (float): Enables maximal-marginal-relevance diversification when set
+
+        Returns:
+            list: The documents, most relevant first
+        """
+        self._build_pending_index()
+        if self.index is None or self.index.ntotal == 0:
             return []
 
-        query_vec = self.model.encode(query).reshape(1, -1)
-        distances, indices = self.index.search(query_vec, k)
-        return [self.texts[i] for i in indices[0]]
+        two_stage = reranker is not None or mmr_lambda is not None
+        fetch = min(self.index.ntotal, max(k, candidates) if two_stage else k)
+
+        query_vec = self.encode([query]).reshape(1, -1)
+        distances, indices = self.index.search(query_vec, fetch)
+        hits = [(int(i), float(d)) for i, d in zip(indices[0], distances[0]) if i >= 0]
+        if not two_stage:
+            return [self.texts[i] for i, _ in hits[:k]]
+
+        ids = [i for i, _ in hits]
+        if reranker is not None:
+            relevance = reranker.score(query, [document_text(self.texts[i]) for i in ids])
+        else:
+            relevance = -np.asarray([d for _, d in hits], dtype="float32")
+
+        if mmr_lambda is None:
+            order = np.argsort(-relevance)[:k]
+        else:
+            vectors = np.vstack([self.index.reconstruct(i) for i in ids])
+            order = maximal_marginal_relevance(relevance, vectors, k, diversity_lambda=mmr_lambda)
+        return [self.texts[ids[j]] for j in order]